@@ -3,6 +3,7 @@ import {
   createAssignmentType,
   deleteAssignmentType,
   getAssignmentType,
+  getAssignmentTypeChanges,
   getAssignmentTypes,
   getAssignmentTypesMetadata,
   updateAssignmentType,
@@ -24,9 +25,12 @@ type AssignmentLibrary = {
   generatedAt: string;
   details: AssignmentTypeDetail[];
   assignments: Assignment[];
+  // `generated_at` of the last /types?since= response; only the server's own
+  // cursor is guaranteed to yield a delta rather than the full catalogue.
+  cursor?: string;
 };
 
-async function fetchAssignmentLibrary(): Promise<AssignmentLibrary> {
+async function fetchAssignmentLibrary(previous?: AssignmentLibrary): Promise<AssignmentLibrary> {
   let fallback: AssignmentLibrary;
 
   try {
@@ -52,31 +56,40 @@ async function fetchAssignmentLibrary(): Promise<AssignmentLibrary> {
   try {
     const metadata = await getAssignmentTypesMetadata();
     const backendGenerated = metadata.generated_at ?? '';
-    if (!backendGenerated || backendGenerated <= fallback.generatedAt) {
-      return fallback;
+    const base = previous?.source === 'live' && previous.cursor ? previous : fallback;
+    if (!backendGenerated || backendGenerated <= base.generatedAt) {
+      return base;
     }
 
-    const summaries = await getAssignmentTypes();
-    const detailRecords = await Promise.all(
-      summaries.map(({ id }) => getAssignmentType(id)),
+    // Only fetch what changed since the previous live fetch. The first fetch
+    // passes the bundle's timestamp, which the server answers with everything
+    // unless it has tracked deletions since then.
+    const changes = await getAssignmentTypeChanges(base.cursor ?? base.generatedAt);
+    const byId = new Map(
+      changes.full ? [] : base.details.map((detail) => [detail.id, detail] as const),
     );
+    changes.deleted.forEach((id) => byId.delete(id));
+    changes.types.forEach((detail) => byId.set(detail.id, detail));
+    const detailRecords = [...byId.values()].sort((a, b) => a.id.localeCompare(b.id));
 
     return {
       source: 'live',
       generatedAt: backendGenerated,
       details: detailRecords,
       assignments: detailRecords.map((detail) => buildAssignmentFromDetail(detail)),
+      cursor: changes.generated_at,
     };
   } catch (error) {
     console.warn('[assignment-types] Falling back to cached data', error);
-    return fallback;
+    return previous?.source === 'live' ? previous : fallback;
   }
 }
 
 export function useAssignmentTypeLibrary() {
+  const qc = useQueryClient();
   return useQuery<AssignmentLibrary>({
     queryKey: LIBRARY_KEY,
-    queryFn: fetchAssignmentLibrary,
+    queryFn: () => fetchAssignmentLibrary(qc.getQueryData<AssignmentLibrary>(LIBRARY_KEY)),
     staleTime: 30_000, // 30 seconds - faster updates after admin changes
   });
 }
@@ -2,12 +2,17 @@ import { http } from '../providers/client';
 import type {
   AssignmentTypeSummary,
   AssignmentTypeDetail,
+  AssignmentTypeChanges,
   AssignmentTypeInput,
 } from '../types/assignmentTypes';
 
 export const getAssignmentTypes = () =>
   http<AssignmentTypeSummary[]>('/types');
 
+// Types changed or deleted since `since`; `full` means `types` is the whole catalogue.
+export const getAssignmentTypeChanges = (since: string) =>
+  http<AssignmentTypeChanges>(`/types?since=${encodeURIComponent(since)}`);
+
 export const getAssignmentType = (id: string) =>
   http<AssignmentTypeDetail>(`/types/${encodeURIComponent(id)}`);
 
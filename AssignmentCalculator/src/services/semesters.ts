@@ -1,12 +1,19 @@
 // Semester service - connects to backend /semesters API
 import { http } from '../utils/http';
 
+export interface SemesterBreak {
+  name?: string;
+  start_date: string; // ISO date string (YYYY-MM-DD), inclusive
+  end_date: string;   // ISO date string (YYYY-MM-DD), inclusive
+}
+
 export interface Semester {
   id: string;
   name: string;
   start_date: string; // ISO date string (YYYY-MM-DD)
   end_date: string;   // ISO date string (YYYY-MM-DD)
   detail?: string;    // Optional description
+  breaks?: SemesterBreak[]; // Non-teaching ranges; no milestones are scheduled in them
 }
 
 export const getSemesters = () =>
@@ -21,6 +28,12 @@ export const createSemester = (semester: Omit<Semester, 'id'>) =>
     body: JSON.stringify(semester),
   });
 
+export const importSemesters = (semesters: Array<Omit<Semester, 'id'> & { id?: string }>) =>
+  http<{ imported: number; semesters: Semester[] }>('/semesters/bulk', {
+    method: 'POST',
+    body: JSON.stringify(semesters),
+  });
+
 export const deleteSemester = (id: string) =>
   http<void>(`/semesters/${encodeURIComponent(id)}`, {
     method: 'DELETE',
@@ -19,6 +19,13 @@ export type AssignmentTypeDetail = {
     icon?: string | null;
 };
 
+export type AssignmentTypeChanges = {
+    generated_at: string;
+    full: boolean;
+    types: AssignmentTypeDetail[];
+    deleted: string[];
+};
+
 export type AssignmentTypeInput = {
     id?: string;
     title: string;
@@ -2,6 +2,8 @@ from flask import Flask, jsonify, request, current_app
 from werkzeug.exceptions import HTTPException
 from datetime import timezone
 
+from .routes.conditional import CACHE_POLICY_KEY
+from .services import plan_store
 from .routes.export import export_bp, init_metrics, register_metrics_hooks
 from .routes.plan import bp as plan_bp
 from .routes.health import bp as health_bp
@@ -18,9 +20,9 @@ def create_app():
         JSON_SORT_KEYS=False,
     )
 
-    # Shared in-memory store for all blueprints
-    if "PLANS" not in app.config:
-        app.config["PLANS"] = {}
+    # Plan store shared by all blueprints: in-memory, or SQLite when PLAN_DB is set
+    if "PLAN_STORE" not in app.config:
+        app.config["PLAN_STORE"] = plan_store.from_config(app.config)
 
     # Metrics setup
     init_metrics(app)
@@ -34,10 +36,10 @@ def create_app():
     app.register_blueprint(bp_semesters)  # ✨ Register semesters blueprint
     app.register_blueprint(admin_bp)  # ✨ NEW: register admin blueprint
 
-    # Add no-store headers to all responses
+    # Routes without their own cache policy (see routes/conditional.py) are never cached
     @app.after_request
     def add_headers(resp):
-        resp.headers["Cache-Control"] = "no-store"
+        resp.headers["Cache-Control"] = request.environ.get(CACHE_POLICY_KEY, "no-store")
         return resp
 
     # Handle HTTP errors (e.g., 404, 400)
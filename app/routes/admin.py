@@ -55,6 +55,9 @@ HTML_TEMPLATE = """
     </div>
 
     <div id="types-container" class="grid gap-4"></div>
+    <div class="flex justify-center mt-6">
+      <button id="btn-more" class="btn btn-blue hidden">Load more</button>
+    </div>
   </main>
 
   <!-- Modal -->
@@ -110,12 +113,19 @@ HTML_TEMPLATE = """
   ];
   let editId = null;
 
-  async function fetchTypes() {
-    const res = await fetch("/types");
+  const PAGE_SIZE = 50;
+  let nextCursor = null;
+  let searchTimer = null;
+
+  // Search and paging happen server-side; `append` loads the next page of the current query.
+  async function fetchTypes(append = false) {
+    const params = new URLSearchParams({ q: document.getElementById("search").value, limit: PAGE_SIZE });
+    if (append && nextCursor) params.set("cursor", nextCursor);
+    const res = await fetch(`/types?${params}`);
     const data = await res.json();
-    const searchTerm = document.getElementById("search").value.toLowerCase();
-    const filtered = data.filter(t => t.id.includes(searchTerm) || (t.title||"").toLowerCase().includes(searchTerm));
-    container.innerHTML = filtered.map(t => `
+    nextCursor = data.next_cursor;
+    document.getElementById("btn-more").classList.toggle("hidden", !nextCursor);
+    const html = data.items.map(t => `
       <div class="card flex justify-between items-center">
         <div>
           <h2 class="font-semibold text-lg text-[#27348B]">${t.title}</h2>
@@ -126,9 +136,14 @@ HTML_TEMPLATE = """
           <button class="btn btn-red" onclick="deleteType('${t.id}')">Delete</button>
         </div>
       </div>`).join("");
+    container.innerHTML = append ? container.innerHTML + html : html;
   }
 
-  document.getElementById("search").addEventListener("input", fetchTypes);
+  document.getElementById("search").addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => fetchTypes(), 150);
+  });
+  document.getElementById("btn-more").addEventListener("click", () => fetchTypes(true));
 
   async function editType(id) {
     const res = await fetch(`/types/${id}`);
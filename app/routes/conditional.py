@@ -0,0 +1,66 @@
+"""Conditional GET helpers for the read-mostly endpoints.
+
+Views decorated with `conditional` get ``ETag``/``Last-Modified`` headers
+derived from the backing store, and a bare 304 when the client's
+``If-None-Match`` (or ``If-Modified-Since``) still matches, without running
+the view or serializing its payload.
+
+The ``Cache-Control`` policy is per route: the decorator's default can be
+overridden by endpoint name through ``app.config["CACHE_POLICIES"]``. It is
+handed to the app-wide ``after_request`` hook through the WSGI environ;
+every other response stays ``no-store``.
+"""
+
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import current_app, make_response, request
+
+# (etag, last modified as a POSIX timestamp or 0 if unknown), or None when
+# there is nothing to validate.
+Validators = Optional[Tuple[str, float]]
+
+REVALIDATE = "no-cache"
+# For content-addressed resources whose URL changes whenever the content does.
+IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_POLICY_KEY = "assignment_calculator.cache_policy"
+
+
+def _policy(default: str) -> str:
+    return current_app.config.get("CACHE_POLICIES", {}).get(request.endpoint, default)
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since
+
+
+def conditional(validators: Callable[..., Validators], cache_control: str = REVALIDATE):
+    """Decorate a GET view; `validators` receives the view's URL arguments."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            found = validators(*args, **kwargs)
+            if found is None:
+                return view(*args, **kwargs)
+            etag, mtime = found
+            last_modified = datetime.fromtimestamp(mtime, tz=timezone.utc) if mtime else None
+            if _not_modified(etag, last_modified):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag)
+            if last_modified is not None:
+                resp.last_modified = last_modified
+            request.environ[CACHE_POLICY_KEY] = _policy(cache_control)
+            return resp
+
+        return wrapper
+
+    return decorator
@@ -1,14 +1,49 @@
 # app/routes/export.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from io import BytesIO
+from typing import Callable, Dict, Tuple
+
 from flask import Blueprint, current_app, abort, send_file, jsonify, request
 from app.services.pdf import build_plan_pdf
 from app.services.ics import build_plan_ics
+from app.services import yaml_loader
+from app.services.generator import generation_cache_stats
+from app.services.plan_store import PlanStore
 
 # Blueprint with URL prefix for cleaner routing
 export_bp = Blueprint("export", __name__, url_prefix="/export")
 
-def _store():
-    """Access the shared in-memory plan store."""
-    return current_app.config.setdefault("PLANS", {})
+def _store() -> PlanStore:
+    """The app's plan store (see `services.plan_store`)."""
+    return current_app.config["PLAN_STORE"]
+
+# Rendered exports keyed by a hash of everything they depend on. Plans record
+# the immutable type version of every assignment, so equal keys mean equal output.
+EXPORT_CACHE_SIZE = 64
+_rendered: "OrderedDict[str, bytes]" = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def _render(kind: str, plan: Dict, build: Callable[[Dict], BytesIO]) -> Tuple[bytes, str]:
+    """Rendered export bytes and their content key (used as the ETag)."""
+    # The PDF footer carries today's date, so it is part of the key.
+    inputs = [kind, plan, date.today().isoformat() if kind == "pdf" else None]
+    key = hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    with _rendered_lock:
+        data = _rendered.get(key)
+        if data is not None:
+            _rendered.move_to_end(key)
+            return data, key
+    data = build(plan).getvalue()
+    with _rendered_lock:
+        _rendered[key] = data
+        while len(_rendered) > EXPORT_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return data, key
 
 def init_metrics(app):
     app.config["METRICS"] = {
@@ -22,16 +57,17 @@ def export_pdf(plan_id: str):
     plan = _store().get(plan_id)
     if not plan:
         abort(404, description="plan not found")
-    pdf_bytes = build_plan_pdf(plan)
+    pdf_bytes, etag = _render("pdf", plan, build_plan_pdf)
 
     # Increment PDF export count
     current_app.config["METRICS"]["exports"]["pdf"] += 1
 
     return send_file(
-        pdf_bytes,
+        BytesIO(pdf_bytes),
         mimetype="application/pdf",
         as_attachment=True,
         download_name=f"plan_{plan_id}.pdf",
+        etag=etag,
     )
 
 @export_bp.get("/<plan_id>.ics")
@@ -39,21 +75,26 @@ def export_ics(plan_id: str):
     plan = _store().get(plan_id)
     if not plan:
         abort(404, description="plan not found")
-    ics_bytes = build_plan_ics(plan)
+    ics_bytes, etag = _render("ics", plan, build_plan_ics)
 
     # Increment ICS export count
     current_app.config["METRICS"]["exports"]["ics"] += 1
 
     return send_file(
-        ics_bytes,
+        BytesIO(ics_bytes),
         mimetype="text/calendar",
         as_attachment=True,
         download_name=f"plan_{plan_id}.ics",
+        etag=etag,
     )
 
 @export_bp.get("/metrics")
 def metrics():
-    return jsonify(current_app.config["METRICS"])
+    return jsonify({
+        **current_app.config["METRICS"],
+        "generation_cache": generation_cache_stats(),
+        "yaml": yaml_loader.stats(),
+    })
 
 # Global route counter (should be in app/__init__.py)
 def register_metrics_hooks(app):
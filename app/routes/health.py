@@ -1,7 +1,13 @@
 from flask import Blueprint, current_app, jsonify
 
+from app.services import yaml_loader
+
 bp = Blueprint("health", __name__)
 
 @bp.get("/healthz")
 def healthz():
-    return jsonify({"status": "ok", "version": current_app.config.get("APP_VERSION", "v0")})
+    return jsonify({
+        "status": "ok",
+        "version": current_app.config.get("APP_VERSION", "v0"),
+        "yaml_loader": yaml_loader.LOADER,
+    })
@@ -1,20 +1,124 @@
-from flask import Blueprint, request, jsonify, abort, current_app
+import json
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, request, jsonify, abort, current_app, stream_with_context
 from uuid import uuid4
 from datetime import datetime, timezone
-from app.services.generator import generate_milestones_for_plan
+from app.services.generator import (
+    DEFAULT_HOURS_PER_DAY,
+    SCHEDULERS,
+    generate_milestones_for_plan,
+    generate_milestones_for_plans,
+    iter_generate_milestones_for_plan,
+    iter_regenerate_milestones_for_plan,
+    mark_assignment_dirty,
+    regenerate_milestones_for_plan,
+    remove_assignment,
+)
+from app.services.plan_store import PlanStore
 
 bp = Blueprint("plan", __name__, url_prefix="/plan")
 bp.strict_slashes = False  # 👈 Accept /generate and /generate/
 
-def _store():
-    return current_app.config.setdefault("PLANS", {})
+def _store() -> PlanStore:
+    return current_app.config["PLAN_STORE"]
 
 def _new_id():
     return str(uuid4())
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Fields that change where milestones land; editing any of them marks the assignment dirty.
+_SCHEDULING_FIELDS = ("type", "start_date", "due_date", "estimated_hours")
+
+def _normalise_assignment(a, start_date: str, label: str):
+    if not isinstance(a, dict):
+        abort(400, description=f"{label} must be an object")
+    due = (a.get("due_date") or a.get("dueDate") or "").strip()
+    if len(due) >= 10:
+        due = due[:10]
+    if not due:
+        abort(400, description=f"{label}.due_date is required")
+
+    return {
+        "id": a.get("id") or _new_id(),
+        "unit": str(a["unit"]).strip(),
+        "title": str(a["title"]).strip(),
+        "type": (a.get("type") or "report").strip().lower(),
+        "estimated_hours": float(a.get("estimated_hours") or 0),
+        "start_date": start_date,
+        "due_date": due,
+        "dueDate": due,
+    }
+
+def _wants_ndjson() -> bool:
+    return any(m == NDJSON_MIMETYPE for m, _ in request.accept_mimetypes)
+
+def _count_generated(app, n: int = 1) -> None:
+    app.config.setdefault("METRICS", {
+        "routes": {}, "exports": {"pdf": 0, "ics": 0}, "generated": 0
+    })
+    app.config["METRICS"]["generated"] += n
+
+# Attempts at saving a generated plan before giving up because it keeps changing.
+_GENERATE_ATTEMPTS = 3
+_CHANGED_WHILE_GENERATING = "plan changed while it was being generated; nothing was saved"
+
+def _generate_stream(plan_id: str):
+    """NDJSON variant of /generate: one line per assignment as soon as it is scheduled.
+
+    Lines are ``{"type": "plan", ...}`` (plan fields without assignments),
+    then ``{"type": "assignment", "index", "recomputed", "assignment"}`` per
+    assignment, then ``{"type": "done", "updated_at", "warnings"}``. Errors
+    after the response has started are sent as ``{"type": "error", "message"}``.
+    """
+    store = _store()
+    plan, revision = _snapshot_or_404(plan_id)
+    if request.args.get("full") in {"1", "true"}:
+        steps = ((a, True) for a in iter_generate_milestones_for_plan(plan))
+    else:
+        steps = iter_regenerate_milestones_for_plan(plan)
+    app = current_app._get_current_object()
+
+    def lines():
+        header = {k: v for k, v in plan.items() if k != "assignments"}
+        yield json.dumps({"type": "plan", **header}) + "\n"
+        try:
+            for index, (a, recomputed) in enumerate(steps):
+                yield json.dumps({
+                    "type": "assignment", "index": index, "recomputed": recomputed, "assignment": a,
+                }) + "\n"
+        except ValueError as e:
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+            return
+        plan["updated_at"] = datetime.now(timezone.utc).isoformat()
+        if not store.put_if_unchanged(plan, revision):
+            yield json.dumps({"type": "error", "message": _CHANGED_WHILE_GENERATING}) + "\n"
+            return
+        _count_generated(app)
+        yield json.dumps({
+            "type": "done", "updated_at": plan["updated_at"], "warnings": plan.get("warnings", []),
+        }) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype=NDJSON_MIMETYPE)
+
+def _snapshot_or_404(plan_id: str):
+    """(private copy of the plan, revision) for generating outside any lock."""
+    found = _store().snapshot(plan_id)
+    if not found:
+        abort(404, description="plan not found")
+    return found
+
+@contextmanager
+def _editing_or_404(plan_id: str):
+    """Yield the stored plan for a read-modify-write; it is saved when the block completes."""
+    with _store().editing(plan_id) as plan:
+        if not plan:
+            abort(404, description="plan not found")
+        yield plan
+
 @bp.route("/", methods=["POST"])
 def create_plan():
-    store = _store()
     data = request.get_json(force=True)
     title = str(data.get("title", "")).strip()
     start_date = str(data.get("start_date", "")).strip()
@@ -23,56 +127,127 @@ def create_plan():
     if not title or not start_date or not isinstance(assignments, list):
         abort(400, description="Missing title, start_date, or assignments list")
 
-    norm = []
-    for i, a in enumerate(assignments):
-        due = (a.get("due_date") or a.get("dueDate") or "").strip()
-        if len(due) >= 10:
-            due = due[:10]
-        if not due:
-            abort(400, description=f"assignments[{i}].due_date is required")
-
-        norm.append({
-            "id": a.get("id") or _new_id(),
-            "unit": str(a["unit"]).strip(),
-            "title": str(a["title"]).strip(),
-            "type": (a.get("type") or "report").strip().lower(),
-            "estimated_hours": float(a.get("estimated_hours") or 0),
-            "start_date": start_date,
-            "due_date": due,
-            "dueDate": due,
-        })
+    scheduler = str(data.get("scheduler") or "spread").strip().lower()
+    if scheduler not in SCHEDULERS:
+        abort(400, description=f"scheduler must be one of {sorted(SCHEDULERS)}")
+    try:
+        hours_per_day = float(data.get("hours_per_day") or DEFAULT_HOURS_PER_DAY)
+    except (TypeError, ValueError):
+        abort(400, description="hours_per_day must be a number")
+    if hours_per_day <= 0:
+        abort(400, description="hours_per_day must be positive")
+
+    norm = [_normalise_assignment(a, start_date, f"assignments[{i}]") for i, a in enumerate(assignments)]
 
     plan_id = _new_id()
-    store[plan_id] = {
+    plan = {
         "plan_id": plan_id,
         "title": title,
         "start_date": start_date,
+        "scheduler": scheduler,
+        "hours_per_day": hours_per_day,
         "assignments": norm,
+        "dirty_assignments": [],
     }
+    _store().put(plan)
 
-    return jsonify(store[plan_id]), 201
+    return jsonify(plan), 201
 
-@bp.route("/<plan_id>/generate", methods=["GET", "POST"])
-@bp.route("/<plan_id>/generate/", methods=["GET", "POST"])  # 👈 Handles trailing slash
-def generate(plan_id: str):
+@bp.route("/<plan_id>/assignments", methods=["POST"])
+def add_assignment(plan_id: str):
+    data = request.get_json(silent=True) or {}
+    with _editing_or_404(plan_id) as plan:
+        a = _normalise_assignment(data, plan["start_date"], "assignment")
+        if any(x.get("id") == a["id"] for x in plan["assignments"]):
+            abort(400, description="assignment id already exists")
+        plan["assignments"].append(a)
+        mark_assignment_dirty(plan, a["id"])
+    return jsonify(a), 201
+
+@bp.route("/<plan_id>/assignments/<assignment_id>", methods=["PATCH"])
+def update_assignment(plan_id: str, assignment_id: str):
+    data = request.get_json(silent=True) or {}
+    with _editing_or_404(plan_id) as plan:
+        a = next((x for x in plan["assignments"] if x.get("id") == assignment_id), None)
+        if a is None:
+            abort(404, description="assignment not found")
+        start_date = str(data.get("start_date") or a.get("start_date") or plan["start_date"]).strip()[:10]
+        changes = dict(data)
+        if "dueDate" in changes and "due_date" not in changes:
+            # Either spelling may be sent; the stored due_date must not shadow it.
+            changes["due_date"] = changes.pop("dueDate")
+        merged = _normalise_assignment({**a, **changes, "id": assignment_id}, start_date, "assignment")
+        if any(merged.get(f) != a.get(f) for f in _SCHEDULING_FIELDS):
+            mark_assignment_dirty(plan, assignment_id)
+        a.update(merged)
+    return jsonify(a), 200
+
+@bp.route("/<plan_id>/assignments/<assignment_id>", methods=["DELETE"])
+def delete_assignment(plan_id: str, assignment_id: str):
+    with _editing_or_404(plan_id) as plan:
+        if not remove_assignment(plan, assignment_id):
+            abort(404, description="assignment not found")
+    return "", 204
+
+@bp.route("/generate-batch", methods=["POST"])
+def generate_batch():
+    """Regenerate many stored plans in one request (defaults to every stored plan)."""
     store = _store()
-    plan = store.get(plan_id)
-    if not plan:
-        abort(404, description="plan not found")
+    data = request.get_json(silent=True) or {}
+    plan_ids = data.get("plan_ids")
+    if plan_ids is None:
+        plan_ids = store.ids()
+    if not isinstance(plan_ids, list):
+        abort(400, description="plan_ids must be a list")
+    # Each plan once, in first-seen order: a repeat would reuse the same
+    # snapshot and then fail to save as if the plan had changed.
+    plan_ids = list(dict.fromkeys(map(str, plan_ids)))
 
-    print("DEBUG generate input:", {
-        "ids": [a.get("id") for a in plan["assignments"]],
-        "keys": [list(a.keys()) for a in plan["assignments"]]
+    found = store.snapshot_many(plan_ids)
+    missing = [pid for pid in plan_ids if pid not in found]
+    if missing:
+        abort(404, description=f"plan not found: {', '.join(missing[:10])}")
+
+    plans = [found[pid][0] for pid in plan_ids]
+    errors = generate_milestones_for_plans(plans)
+
+    # Each plan is saved only if no edit landed while the batch was generated;
+    # otherwise it is reported as an error rather than overwriting the edit.
+    now = datetime.now(timezone.utc).isoformat()
+    for i, plan in enumerate(plans):
+        if i in errors:
+            continue
+        plan["updated_at"] = now
+        if not store.put_if_unchanged(plan, found[plan["plan_id"]][1]):
+            errors[i] = _CHANGED_WHILE_GENERATING
+    _count_generated(current_app, len(plans) - len(errors))
+
+    return jsonify({
+        "generated": len(plans) - len(errors),
+        "plans": [p for i, p in enumerate(plans) if i not in errors],
+        "errors": [{"plan_id": plans[i]["plan_id"], "message": msg} for i, msg in sorted(errors.items())],
     })
 
-    try:
-        generate_milestones_for_plan(plan)
-        current_app.config.setdefault("METRICS", {
-            "routes": {}, "exports": {"pdf": 0, "ics": 0}, "generated": 0
-        })
-        current_app.config["METRICS"]["generated"] += 1
-        plan["updated_at"] = datetime.now(timezone.utc).isoformat()
-    except ValueError as e:
-        abort(400, description=str(e))
+@bp.route("/<plan_id>/generate", methods=["GET", "POST"])
+@bp.route("/<plan_id>/generate/", methods=["GET", "POST"])  # 👈 Handles trailing slash
+def generate(plan_id: str):
+    if _wants_ndjson():
+        return _generate_stream(plan_id)
 
-    return jsonify(plan)
\ No newline at end of file
+    # Generate on a private copy without holding any lock, then save it only if
+    # the stored plan did not change meanwhile; start over if it did.
+    store = _store()
+    for _ in range(_GENERATE_ATTEMPTS):
+        plan, revision = _snapshot_or_404(plan_id)
+        try:
+            if request.args.get("full") in {"1", "true"}:
+                generate_milestones_for_plan(plan)
+            else:
+                regenerate_milestones_for_plan(plan)
+        except ValueError as e:
+            abort(400, description=str(e))
+        plan["updated_at"] = datetime.now(timezone.utc).isoformat()
+        if store.put_if_unchanged(plan, revision):
+            _count_generated(current_app)
+            return jsonify(plan)
+    abort(409, description=_CHANGED_WHILE_GENERATING)
\ No newline at end of file
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import csv
+import io
 from datetime import datetime
+from typing import Any, Dict, List
 from flask import Blueprint, jsonify, request, abort
 
+from app.routes.conditional import conditional
 from app.services import semester_store
+from app.services.dates import parse_day
 
 bp_semesters = Blueprint("semesters", __name__, url_prefix="/semesters")
 
@@ -17,11 +22,26 @@ def _parse_iso(date_str: str, field: str) -> str:
 
 
 @bp_semesters.get("")
+@conditional(semester_store.cache_validators)
 def list_semesters():
     return jsonify(semester_store.list_semesters())
 
 
+@bp_semesters.get("/at")
+@conditional(lambda: semester_store.cache_validators())
+def semester_at():
+    try:
+        day = parse_day(request.args.get("date") or "")
+    except ValueError:
+        abort(400, description="date must be an ISO date (YYYY-MM-DD)")
+    semester = semester_store.semester_at(day)
+    if not semester:
+        abort(404, description="no semester contains that date")
+    return jsonify(semester)
+
+
 @bp_semesters.get("/<sid>")
+@conditional(lambda sid: semester_store.cache_validators(sid.strip().lower()))
 def get_semester(sid: str):
     semester = semester_store.get_semester(sid.strip().lower())
     if not semester:
@@ -54,6 +74,8 @@ def create_semester():
     }
     if detail:
         payload["detail"] = detail
+    if body.get("breaks") is not None:
+        payload["breaks"] = body["breaks"]
 
     try:
         saved = semester_store.save_semester(payload)
@@ -63,6 +85,70 @@ def create_semester():
     return jsonify(saved), 201
 
 
+def _csv_breaks(cell: str) -> List[Dict[str, str]]:
+    """Breaks from a CSV cell: `;`-separated `[name:]start..end` ranges."""
+    breaks = []
+    for part in (cell or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, span = part.rpartition(":")
+        start, _, end = span.partition("..")
+        brk = {"start_date": start.strip(), "end_date": end.strip()}
+        if name.strip():
+            brk["name"] = name.strip()
+        breaks.append(brk)
+    return breaks
+
+
+def _bulk_rows() -> List[Any]:
+    if request.mimetype == "text/csv":
+        reader = csv.DictReader(io.StringIO(request.get_data(as_text=True)))
+        rows: List[Any] = []
+        for record in reader:
+            row = {k.strip(): (v or "").strip() for k, v in record.items() if k}
+            if "breaks" in row:
+                row["breaks"] = _csv_breaks(row["breaks"])
+            rows.append(row)
+        return rows
+    body = request.get_json(silent=True)
+    rows = body.get("semesters") if isinstance(body, dict) else body
+    return rows if isinstance(rows, list) else []
+
+
+@bp_semesters.post("/bulk")
+def bulk_import():
+    rows = _bulk_rows()
+    if not rows:
+        abort(400, description="Request body must be a non-empty JSON array of semesters "
+                               "(or {\"semesters\": [...]}) or a text/csv table")
+    errors = []
+    seen: Dict[str, int] = {}
+    for idx, row in enumerate(rows, start=1):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("must be an object")
+            sid = semester_store.clean_semester(row)["id"]
+        except ValueError as exc:
+            errors.append({"row": idx, "message": str(exc)})
+            continue
+        if sid in seen:
+            errors.append({"row": idx, "message": f"duplicate semester id '{sid}' (also row {seen[sid]})"})
+        else:
+            seen[sid] = idx
+    if errors:
+        return jsonify({
+            "error": "Bad Request",
+            "message": f"{len(errors)} of {len(rows)} rows are invalid; nothing was imported",
+            "errors": errors,
+        }), 400
+    try:
+        saved = semester_store.save_semesters(rows)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return jsonify({"imported": len(saved), "semesters": saved}), 201
+
+
 @bp_semesters.delete("/<sid>")
 def delete_semester(sid: str):
     if not semester_store.delete_semester(sid.strip().lower()):
@@ -1,6 +1,10 @@
+from datetime import datetime, timezone
+
 from flask import Blueprint, request, jsonify, abort
+from werkzeug.exceptions import BadRequest
 from typing import Any, Dict, List
 
+from app.routes.conditional import IMMUTABLE, conditional
 from app.services import type_store
 
 ALLOWED_ICONS = {
@@ -12,6 +16,8 @@ ALLOWED_ICONS = {
     "UserGroupIcon",
 }
 DEFAULT_ICON = "DocumentTextIcon"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 bp_types = Blueprint("types", __name__, url_prefix="/types")
 
@@ -89,24 +95,57 @@ def _validate_payload(data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 @bp_types.get("")
+@conditional(type_store.cache_validators)
 def list_all():
-    out = []
-    for t in type_store.list_types().values():
-        out.append({
-            "id": t["id"],
-            "title": t.get("title") or t["id"].title(),
-            "milestone_count": len(t.get("milestones") or []),
-        })
-    return jsonify(out), 200
+    expand = request.args.get("expand")
+    if expand not in (None, "full"):
+        abort(400, description="expand must be 'full' if provided")
+    if "since" in request.args:
+        return _changes_since(request.args["since"])
+    index = type_store.search_index()
+    if not {"q", "limit", "cursor"} & request.args.keys():
+        if expand:
+            by_id = type_store.list_types()
+            return jsonify([by_id[row["id"]] for row in index.summaries]), 200
+        return jsonify(index.summaries), 200
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        abort(400, description="limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    items, next_cursor, total = index.search(
+        request.args.get("q", ""), limit, request.args.get("cursor") or None
+    )
+    if expand:
+        items = [type_store.get_type(t["id"]) for t in items]
+    return jsonify({"items": items, "next_cursor": next_cursor, "total": total}), 200
+
+
+def _changes_since(raw: str):
+    try:
+        since = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        abort(400, description="since must be an ISO timestamp, e.g. a previous generated_at")
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    changed, deleted, cursor = type_store.changes_since(since.timestamp())
+    full = changed is None
+    if full:
+        changed = sorted(type_store.list_types().values(), key=lambda t: t["id"])
+    stamp = datetime.fromtimestamp(cursor, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+    return jsonify({"generated_at": stamp, "full": full, "types": changed, "deleted": deleted}), 200
 
 
 @bp_types.get("/metadata")
+@conditional(type_store.metadata_validators)
 def metadata():
     meta = type_store.get_metadata()
     return jsonify({"generated_at": meta.get("generated_at")}), 200
 
 
 @bp_types.get("/<tid>")
+@conditional(type_store.cache_validators)
 def get_one(tid: str):
     t = type_store.get_type(tid)
     if not t:
@@ -114,6 +153,21 @@ def get_one(tid: str):
     return jsonify(t), 200
 
 
+def _version_validators(tid: str, version: str):
+    if type_store.get_type_version(tid, version) is None:
+        return None
+    return version, 0.0
+
+
+@bp_types.get("/<tid>/versions/<version>")
+@conditional(_version_validators, cache_control=IMMUTABLE)
+def get_version(tid: str, version: str):
+    t = type_store.get_type_version(tid, version)
+    if not t:
+        abort(404, description="type version not found")
+    return jsonify(t), 200
+
+
 @bp_types.post("")
 def create_type():
     body = request.get_json(silent=True)
@@ -122,6 +176,25 @@ def create_type():
     return jsonify(saved), 201
 
 
+@bp_types.post("/bulk")
+def bulk_import():
+    body = request.get_json(silent=True)
+    items = body.get("types") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        abort(400, description="Request body must be a non-empty array of types (or {\"types\": [...]})")
+    payloads = []
+    for idx, item in enumerate(items):
+        try:
+            payloads.append(_validate_payload(item))
+        except BadRequest as exc:
+            abort(400, description=f"types[{idx}]: {exc.description}")
+    try:
+        saved = type_store.save_types(payloads)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return jsonify({"imported": len(saved), "types": saved}), 201
+
+
 @bp_types.put("/<tid>")
 def update_type(tid: str):
     if not type_store.get_type(tid):
@@ -0,0 +1,32 @@
+"""Day-ordinal helpers shared by the generator and the exporters.
+
+Internally dates are day ordinals (`date.toordinal()`); ISO strings only
+appear at the JSON boundary. Both directions are cached because a plan
+reuses a small set of dates many times over.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8192)
+def parse_day(iso_str: str) -> int:
+    """Day ordinal for an ISO date (or datetime) string; raises ValueError if invalid."""
+    s = (iso_str or "").strip()
+    if not s:
+        raise ValueError("missing date")
+    try:
+        if len(s) == 10 and s[4] == "-" and s[7] == "-":
+            return date(int(s[:4]), int(s[5:7]), int(s[8:])).toordinal()
+        return datetime.fromisoformat(s).date().toordinal()
+    except Exception as e:
+        raise ValueError(f"invalid date '{s}' (expected YYYY-MM-DD)") from e
+
+
+@lru_cache(maxsize=8192)
+def iso_day(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+def today() -> int:
+    return date.today().toordinal()
@@ -0,0 +1,540 @@
+"""Directory-backed document store shared by the type and semester catalogues.
+
+A `DocumentStore` serves the YAML/JSON documents of one data directory,
+keyed by id, from an immutable `Catalog`:
+
+* Change detection: the directory is watched with watchdog when available
+  (``<NAME>_WATCH=0`` turns it off) and otherwise rescanned at most every
+  ``poll_interval`` seconds. A rescan only stats files; files whose
+  mtime/size changed are hashed, and only those whose content changed are
+  parsed again. Cold starts are seeded from the on-disk snapshot (see
+  `snapshot`) and, with ``SHARED_CATALOG=1``, from the catalogue another
+  worker published (see `shared_catalog`).
+* Concurrency: reloads are single flight. The thread that rebuilds builds a
+  new catalogue and publishes it with one assignment; readers take no locks
+  and keep serving the previous catalogue meanwhile.
+* Secondary indexes: each store registers builders that receive the
+  ``id -> document`` mapping and are run once per reload; their results are
+  available as ``catalog.indexes[name]``.
+* Version stamps: every catalogue carries a reload counter, an ETag over all
+  files, the content hash of each document (`content_hash`) and, for delta
+  fetches, the reload time at which each document's content last changed
+  and deletion tombstones.
+* Writes: batches are staged to temp files, renamed into place and rolled
+  back from the previous bytes if anything fails, then the catalogue is
+  rebuilt once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.services import shared_catalog, snapshot, yaml_loader
+
+try:
+    import yaml  # pip install pyyaml
+except ImportError:  # pragma: no cover - JSON documents still work
+    yaml = None
+
+try:
+    from watchdog.events import FileSystemEventHandler  # pip install watchdog
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - falls back to throttled polling
+    FileSystemEventHandler = None
+    Observer = None
+
+SUFFIXES = (".yaml", ".yml", ".json")
+# Deleted ids remembered for `changes_since`.
+MAX_TOMBSTONES = 1000
+
+IndexBuilder = Callable[[Mapping[str, Dict[str, Any]]], Any]
+
+
+def _is_yaml(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in {".yaml", ".yml"}
+
+
+def load_document(path: Path) -> Dict[str, Any]:
+    data = path.read_bytes()
+    text = data.decode("utf-8")
+    if _is_yaml(path.name):
+        if not yaml:
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as exc:  # pragma: no cover - defensive fallback
+                raise RuntimeError("PyYAML not installed — run `pip install pyyaml`") from exc
+        # Keyed by the same digest as the catalogue entry, so `yaml_loader.prune` can spare it.
+        return yaml_loader.load_yaml(text, hashlib.sha1(data).hexdigest()) or {}
+    return json.loads(text)
+
+
+def dump_document(path: Path, doc: Dict[str, Any]) -> str:
+    if path.suffix.lower() in {".yaml", ".yml"} and yaml:
+        return yaml.safe_dump(doc, sort_keys=False, allow_unicode=True)
+    return json.dumps(doc, indent=2, ensure_ascii=False)
+
+
+def slugify(raw: str, default: str = "document") -> str:
+    value = re.sub(r"[^a-z0-9]+", "-", (raw or "").strip().lower())
+    value = re.sub(r"-+", "-", value).strip("-")
+    return value or default
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """SHA-1 of the document's canonical JSON; equal documents share it."""
+    return hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def stage_file(path: Path, text: str) -> str:
+    """Write `text` to a temp file beside `path` (ignored by the scanner) and return its name."""
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return tmp_name
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """One published view of a data directory; never mutated once built."""
+
+    files: Mapping[str, snapshot.Entry]  # file name -> (mtime_ns, size, sha1, doc)
+    by_id: Mapping[str, Dict[str, Any]]
+    etag: str = ""
+    last_modified: float = 0.0
+    version: int = 0
+    generation: int = 0  # shared_catalog generation this was built from (shared mode)
+    # id -> `content_hash` of its current document
+    versions: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    # id -> reload time at which its file's content last changed (not its mtime,
+    # which copies and extractions preserve); ids missing here date from `tracked_since`
+    changed_at: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    # id -> deletion time, for documents deleted since `tracked_since`
+    tombstones: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    # Deletions before this time are unknown, so older deltas must be full reloads.
+    tracked_since: float = 0.0
+    # index name -> whatever its builder returned for this catalogue
+    indexes: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+
+def _default_prepare(doc: Dict[str, Any], stem: str) -> Dict[str, Any]:
+    doc["id"] = str(doc.get("id") or stem).strip()
+    return doc
+
+
+class _DirHandler(FileSystemEventHandler if FileSystemEventHandler else object):
+    def __init__(self, state: Dict[str, Any]) -> None:
+        super().__init__()
+        self._state = state
+
+    def on_any_event(self, event) -> None:
+        self._state["stale"] = True
+
+
+class DocumentStore:
+    """Cached, indexed, concurrency-safe view of the documents in `directory`.
+
+    `prepare(doc, file stem)` normalizes every parsed document and must set
+    its ``"id"``; `indexes` maps index names to builders. New documents are
+    written as ``<id><write_suffix>``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        name: str,
+        prepare: Callable[[Dict[str, Any], str], Dict[str, Any]] = _default_prepare,
+        indexes: Optional[Dict[str, IndexBuilder]] = None,
+        write_suffix: str = ".json",
+        slug_default: str = "document",
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.directory = directory
+        self.name = name
+        self.prepare = prepare
+        self.index_builders = dict(indexes or {})
+        self.write_suffix = write_suffix
+        self.slug_default = slug_default
+        self.poll_interval = poll_interval
+        self._catalog = self._make_catalog({}, 0.0, 0, 0, {}, 0.0)
+        # Reload bookkeeping. Only the rebuilding thread writes it, apart from
+        # the watcher flipping "stale".
+        self._state: Dict[str, Any] = {"stale": True, "next_poll": 0.0, "watcher": None, "shared": None}
+        # Held by the one thread rebuilding the catalogue (single flight).
+        self._lock = threading.Lock()
+
+    # -- loading -----------------------------------------------------------
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stamps: Dict[str, Tuple[int, int]] = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return stamps
+        for entry in entries:
+            name = entry.name
+            if name.startswith(("_", ".")) or os.path.splitext(name)[1].lower() not in SUFFIXES:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            stamps[name] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def _refresh(self, force: Iterable[str] = ()) -> None:
+        """Re-parse only files whose content changed (or that are listed in `force`).
+
+        Callers must hold `_lock`.
+        """
+        current = self._catalog
+        files: Mapping[str, snapshot.Entry] = current.files
+        seeded = not files
+        if seeded:
+            files = snapshot.load_snapshot(self.directory)
+        stamps = self._scan()
+        forced = set(force)
+        changed = False
+        # Files whose content differs from what the previous catalogue held.
+        modified: List[str] = []
+        updated = dict(files)
+        for name in files.keys() - stamps.keys():
+            del updated[name]
+            changed = True
+        for name, stamp in stamps.items():
+            known = files.get(name)
+            if known is not None and known[:2] == stamp and name not in forced:
+                continue
+            path = self.directory / name
+            try:
+                digest = snapshot.file_digest(path)
+                if known is not None and known[2] == digest and name not in forced:
+                    updated[name] = (stamp[0], stamp[1], digest, known[3])
+                else:
+                    doc = load_document(path)
+                    if not isinstance(doc, dict):
+                        raise ValueError(f"{name} does not hold a mapping")
+                    updated[name] = (stamp[0], stamp[1], digest, self.prepare(doc, os.path.splitext(name)[0]))
+                    if current.files.get(name, (None, None, None))[2] != digest:
+                        modified.append(name)
+            except FileNotFoundError:  # deleted since the scan
+                updated.pop(name, None)
+            except Exception:
+                # A half-written or broken file: keep serving what it held before, if anything.
+                if known is None:
+                    continue
+            changed = True
+        if changed:
+            snapshot.write_snapshot(self.directory, updated)
+            if any(_is_yaml(name) for name in updated):
+                yaml_loader.prune(entry[2] for name, entry in updated.items() if _is_yaml(name))
+        elif not (seeded and files):
+            return
+        now = time.time()
+        newest = max((entry[0] for entry in updated.values()), default=0) / 1e9
+        if len(updated) < len(files):
+            newest = max(newest, now)  # deletions leave no mtime behind
+        ids = {entry[3]["id"] for entry in updated.values()}
+        tombstones = {key: ts for key, ts in current.tombstones.items() if key not in ids}
+        for key in current.by_id.keys() - ids:
+            tombstones[key] = now
+        tracked_since = current.tracked_since or now
+        if len(tombstones) > MAX_TOMBSTONES:
+            kept = sorted(tombstones.items(), key=lambda item: item[1])[-MAX_TOMBSTONES:]
+            tombstones = dict(kept)
+            tracked_since = max(tracked_since, kept[0][1])
+        changed_at = {key: ts for key, ts in current.changed_at.items() if key in ids}
+        for name in modified:
+            if name in updated:
+                changed_at[updated[name][3]["id"]] = now
+        self._catalog = self._make_catalog(
+            updated, newest, current.version + 1, current.generation, tombstones, tracked_since, changed_at
+        )
+
+    def _make_catalog(
+        self,
+        files: Dict[str, snapshot.Entry],
+        last_modified: float,
+        version: int,
+        generation: int,
+        tombstones: Dict[str, float],
+        tracked_since: float,
+        changed_at: Optional[Dict[str, float]] = None,
+    ) -> Catalog:
+        by_id: Dict[str, Dict[str, Any]] = {}
+        fingerprint = hashlib.sha1()
+        for name in sorted(files):
+            _, _, digest, doc = files[name]
+            by_id[doc["id"]] = doc
+            fingerprint.update(f"{name}:{digest};".encode("utf-8"))
+        frozen = MappingProxyType(by_id)
+        return Catalog(
+            files=MappingProxyType(files),
+            by_id=frozen,
+            etag=fingerprint.hexdigest(),
+            last_modified=last_modified,
+            version=version,
+            generation=generation,
+            versions=MappingProxyType({key: content_hash(doc) for key, doc in by_id.items()}),
+            changed_at=MappingProxyType(dict(changed_at or {})),
+            tombstones=MappingProxyType(tombstones),
+            tracked_since=tracked_since,
+            indexes=MappingProxyType({name: build(frozen) for name, build in self.index_builders.items()}),
+        )
+
+    # -- cross-process sharing ---------------------------------------------
+
+    def _shared(self) -> Optional[shared_catalog.SharedCatalog]:
+        if not shared_catalog.enabled():
+            return None
+        if self._state.get("shared") is None:
+            self._state["shared"] = shared_catalog.SharedCatalog(self.directory)
+        return self._state["shared"]
+
+    def _adopt_shared(self, shared: shared_catalog.SharedCatalog) -> None:
+        """Switch to the catalogue another worker published. Callers must hold `_lock`."""
+        generation = shared.generation()
+        if generation == self._catalog.generation:
+            return
+        payload = shared.load()
+        if payload is None:
+            return
+        self._catalog = self._make_catalog(
+            payload["files"],
+            payload["last_modified"],
+            self._catalog.version + 1,
+            generation,
+            payload["tombstones"],
+            payload["tracked_since"],
+            payload.get("changed_at"),
+        )
+
+    def _rebuild(self, force: Iterable[str] = (), wait: bool = False) -> None:
+        """Rescan the directory; in shared mode, only the worker holding the flock does.
+
+        Callers must hold `_lock`.
+        """
+        shared = self._shared()
+        if shared is None:
+            self._refresh(force)
+            return
+        # With nothing loaded yet there is no previous catalogue to keep serving,
+        # so a cold worker waits for the rescan in progress and adopts its result.
+        cold = self._catalog.version == 0
+        with shared.rebuild_lock(blocking=wait or cold) as won:
+            if not won:
+                # Another worker is rescanning; retry (or adopt its result) on the next lookup.
+                self._state["stale"] = True
+                return
+            self._adopt_shared(shared)
+            before = self._catalog
+            self._refresh(force)
+            if self._catalog is not before or shared.generation() == 0:
+                generation = shared.publish({
+                    "files": dict(self._catalog.files),
+                    "last_modified": self._catalog.last_modified,
+                    "changed_at": dict(self._catalog.changed_at),
+                    "tombstones": dict(self._catalog.tombstones),
+                    "tracked_since": self._catalog.tracked_since,
+                })
+                self._catalog = replace(self._catalog, generation=generation)
+
+    # -- freshness ---------------------------------------------------------
+
+    def _start_watcher(self) -> None:
+        """Watch the directory with inotify (via watchdog) so lookups never touch the disk."""
+        if (
+            Observer is None
+            or os.environ.get(f"{self.name.upper()}_WATCH", "1") == "0"
+            or not self.directory.is_dir()
+        ):
+            return
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_DirHandler(self._state), str(self.directory), recursive=False)
+            observer.start()
+        except Exception:  # no inotify watches left, unsupported fs, ...: keep polling
+            return
+        self._state["watcher"] = observer
+
+    def _needs_reload(self) -> bool:
+        state = self._state
+        return state["stale"] or (state["watcher"] is None and time.monotonic() >= state["next_poll"])
+
+    def catalog(self) -> Catalog:
+        """Current catalogue, reloading first if it may be out of date.
+
+        Only one thread reloads at a time. While it does, other threads keep
+        serving the previous catalogue; they only wait on a cold start, when
+        there is nothing to serve yet.
+        """
+        shared = self._shared()
+        behind = shared is not None and shared.generation() != self._catalog.generation
+        if not behind and not self._needs_reload():
+            return self._catalog
+        if not self._lock.acquire(blocking=self._catalog.version == 0):
+            return self._catalog
+        try:
+            if shared is not None:
+                self._adopt_shared(shared)
+            if self._needs_reload():
+                if self._state["watcher"] is None:
+                    self._start_watcher()
+                # Clear the flag first so an event that lands mid-scan triggers another one.
+                self._state["stale"] = False
+                self._state["next_poll"] = time.monotonic() + self.poll_interval
+                self._rebuild()
+        finally:
+            self._lock.release()
+        return self._catalog
+
+    def invalidate(self, *names: str) -> None:
+        """Pick up our own writes immediately, even if mtime and size did not change."""
+        with self._lock:
+            self._state["stale"] = False
+            self._state["next_poll"] = time.monotonic() + self.poll_interval
+            self._rebuild(force=names, wait=True)
+
+    # -- reads -------------------------------------------------------------
+
+    def slugify(self, raw: str) -> str:
+        return slugify(raw, self.slug_default)
+
+    def get(self, key: str, catalog: Optional[Catalog] = None) -> Optional[Dict[str, Any]]:
+        by_id = (catalog or self.catalog()).by_id
+        doc = by_id.get(key)
+        if doc is None:
+            doc = by_id.get(self.slugify(key or ""))
+        return doc
+
+    def validators(self, key: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """(etag, last modified) for the whole catalogue, or for one document (None if unknown)."""
+        catalog = self.catalog()
+        if key is None:
+            return catalog.etag, catalog.last_modified
+        doc = self.get(key, catalog)
+        if doc is None:
+            return None
+        return catalog.versions[doc["id"]], catalog.last_modified
+
+    def changes_since(self, since: float) -> Tuple[Optional[List[Dict[str, Any]]], List[str], float]:
+        """Documents changed and ids deleted after `since` (POSIX seconds).
+
+        Returns (changed docs sorted by id, deleted ids, cursor). The changed
+        list is None when deletions that old are no longer tracked, in which
+        case the caller should send everything. Pass the cursor back as the
+        next `since`.
+        """
+        catalog = self.catalog()
+        changed_at = {key: catalog.changed_at.get(key, catalog.tracked_since) for key in catalog.by_id}
+        cursor = max([catalog.tracked_since, *changed_at.values(), *catalog.tombstones.values()])
+        # Cursors usually travel as ISO timestamps, rounded to the microsecond.
+        if since < catalog.tracked_since - 1e-6:
+            return None, [], cursor
+        since += 1e-6
+        changed = [catalog.by_id[key] for key in sorted(changed_at) if changed_at[key] > since]
+        deleted = sorted(key for key, ts in catalog.tombstones.items() if ts > since)
+        return changed, deleted, cursor
+
+    # -- writes ------------------------------------------------------------
+
+    def _path_for(self, key: str) -> Path:
+        """File `key` is written to; ValueError if that would land outside `directory`."""
+        path = self.directory / f"{key}{self.write_suffix}"
+        if not key or path.resolve().parent != self.directory.resolve():
+            raise ValueError(f"invalid id '{key}'")
+        return path
+
+    def save(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write documents (each with its final ``"id"``) all-or-nothing.
+
+        Every file is staged to a temp file first and then renamed into place;
+        files of the same id with another suffix are removed. If anything
+        fails the previous files are restored. The catalogue is rebuilt once
+        for the whole batch.
+        """
+        incoming: Dict[str, Dict[str, Any]] = {}
+        for doc in docs:
+            if doc["id"] in incoming:
+                raise ValueError(f"duplicate id '{doc['id']}'")
+            self._path_for(doc["id"])
+            incoming[doc["id"]] = doc
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        staged: List[Tuple[str, Path]] = []
+        try:
+            for key, doc in incoming.items():
+                path = self._path_for(key)
+                staged.append((stage_file(path, dump_document(path, doc)), path))
+        except BaseException:
+            for tmp_name, _ in staged:
+                os.unlink(tmp_name)
+            raise
+
+        # Keep the bytes of every file we are about to replace or remove, so a
+        # failure part-way through the renames can put the old catalogue back.
+        touched = [path for _, path in staged]
+        touched += [
+            self.directory / f"{key}{ext}" for key in incoming for ext in SUFFIXES if ext != self.write_suffix
+        ]
+        originals = {path: path.read_bytes() for path in touched if path.exists()}
+        try:
+            for tmp_name, path in staged:
+                os.replace(tmp_name, path)
+            for path in touched:
+                if path.suffix != self.write_suffix and path in originals:
+                    path.unlink()
+        except BaseException:
+            for tmp_name, path in staged:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+                elif path not in originals and path.exists():
+                    path.unlink()
+            for path, data in originals.items():
+                path.write_bytes(data)
+            self.invalidate()
+            raise
+
+        self.invalidate(*(path.name for path in touched))
+        by_id = self._catalog.by_id
+        return [by_id.get(key, doc) for key, doc in incoming.items()]
+
+    def delete(self, key: str) -> bool:
+        """Remove every file of document `key`; False if there was none."""
+        catalog = self.catalog()
+        doc = self.get(key, catalog)
+        if doc is not None:
+            # Whatever file the document was loaded from, under the id `get` resolved.
+            names = {name for name, entry in catalog.files.items() if entry[3]["id"] == doc["id"]}
+            stems = {doc["id"]}
+        else:
+            names, stems = set(), {self.slugify(key)}
+        names.update(f"{stem}{ext}" for stem in stems for ext in SUFFIXES)
+        ok = False
+        for name in names:
+            path = self.directory / name
+            if path.resolve().parent != self.directory.resolve():
+                continue
+            try:
+                path.unlink()
+                ok = True
+            except OSError:
+                continue
+        if ok:
+            self.invalidate()
+        return ok
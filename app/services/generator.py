@@ -1,6 +1,22 @@
-from datetime import date, datetime, timedelta
-from typing import List, Dict, Any
-from app.services.type_store import get_type  # ✨ NEW: import dynamic type loader
+import hashlib
+import heapq
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from app.services.dates import iso_day, parse_day, today
+from app.services.templates import get_template
+from app.services.occupancy import BlockedDays, DayOccupancy
+from app.services.semester_store import blocked_days
+
+try:
+    import numpy as np  # pip install numpy
+except ImportError:  # pragma: no cover - batch mode falls back to the per-plan loop
+    np = None
+
+DEFAULT_HOURS_PER_DAY = 3.0
+SCHEDULERS = {"spread", "capacity"}
 
 # Milestone templates by assignment type
 MILESTONES_BY_TYPE: Dict[str, List[str]] = {
@@ -13,94 +29,71 @@ MILESTONES_BY_TYPE: Dict[str, List[str]] = {
     "other":        ["Start", "Midpoint", "Finalise"],
 }
 
-def _parse_date(iso_str: str) -> date:
-    s = (iso_str or "").strip()
-    if not s:
-        raise ValueError("missing date")
-    try:
-        if len(s) == 10:
-            return datetime.strptime(s, "%Y-%m-%d").date()
-        return datetime.fromisoformat(s).date()
-    except Exception as e:
-        raise ValueError(f"invalid date '{s}' (expected YYYY-MM-DD)") from e
-
-def _evenly_spaced_in_window(start: date, due: date, count: int) -> List[date]:
-    total = (due - start).days
+def _evenly_spaced_in_window(start: int, due: int, count: int) -> List[int]:
+    total = due - start
     last_day = max(1, total - 1)
-    out: List[date] = []
+    out: List[int] = []
     for k in range(1, count + 1):
         pos = round(k * (last_day / (count + 1)))
         pos = max(1, min(last_day, pos))
-        out.append(start + timedelta(days=pos))
+        out.append(start + pos)
     for i in range(1, len(out)):
         if out[i] <= out[i - 1]:
-            out[i] = min(due - timedelta(days=1), out[i - 1] + timedelta(days=1))
+            out[i] = min(due - 1, out[i - 1] + 1)
     return out
 
-def _resolve_collisions(all_dates: Dict[date, int], d: date, start: date, due: date) -> date:
-    if all_dates.get(d, 0) == 0:
-        return d
-    f = d
-    for _ in range(7):
-        f = min(due - timedelta(days=1), f + timedelta(days=1))
-        if all_dates.get(f, 0) == 0:
-            return f
-    b = d
-    for _ in range(7):
-        b = max(start + timedelta(days=1), b - timedelta(days=1))
-        if all_dates.get(b, 0) == 0:
-            return b
-    return d
-
-def _generate_milestones_for_assignment(a: Dict[str, Any], used: Dict[date, int], plan: Dict[str, Any]) -> None:
-    t = (a.get("type") or "other").lower()
+def _resolve_collisions(used: DayOccupancy, d: int, start: int, due: int) -> int:
+    """Nearest free day to ordinal `d` inside `[start+1, due-1]`.
+
+    Days blocked by a semester break count as taken (see `blocked_days`).
+    When every day in the window is taken, stacks on the nearest day outside
+    a break, and only on `d` itself when the whole window is blocked.
+    """
+    nd = used.nearest_free(d, start + 1, due - 1)
+    if nd is None:
+        nd = used.nearest_unblocked(d, start + 1, due - 1)
+    return d if nd is None else nd
+
+def _blocked_key(blocked: BlockedDays) -> List[Any]:
+    """JSON-friendly fingerprint of the blocked days, stored on plans as ``blocked_days_key``."""
+    return [blocked.base, format(blocked.bits, "x")]
 
+def _assignment_window(a: Dict[str, Any], plan: Dict[str, Any]) -> Tuple[int, int]:
+    """(start, due) day ordinals for an assignment."""
     # Accept due_date OR dueDate
     due_iso = a.get("due_date") or a.get("dueDate")
     if not due_iso:
         raise ValueError("assignment missing due date (need 'due_date' or 'dueDate')")
-    due = _parse_date(due_iso)
+    due = parse_day(due_iso)
 
     # Start date: prefer assignment.start_date, else plan.start_date, else today
     start_iso = a.get("start_date") or plan.get("start_date")
-    start = _parse_date(start_iso) if start_iso else date.today()
+    start = parse_day(start_iso) if start_iso else today()
 
     if start >= due:
-        start = max(date.today(), due - timedelta(days=14))
+        start = max(today(), due - 14)
+    return start, due
+
+def _tentative_milestones(a: Dict[str, Any], plan: Dict[str, Any]) -> Tuple[Sequence[str], List[int], Sequence[float], int, int]:
+    """Names, ideal day ordinals and effort shares for an assignment, before collision handling."""
+    t = (a.get("type") or "other").lower()
+    start_ord, due_ord = _assignment_window(a, plan)
 
     # ✨ Try dynamic type definition first
-    tdoc = get_type(t)
-    if tdoc and tdoc.get("milestones"):
-        raw_milestones = list(tdoc["milestones"])
-        effort_values = [max(0, int(m.get("effort_percent") or 0)) for m in raw_milestones]
-        total_effort = sum(effort_values)
-        span_days = max(2, (due - start).days)
-        milestones = []
-        cumulative = 0
-        for idx, m in enumerate(raw_milestones):
-            name = m.get("name") or "Milestone"
-            effort = effort_values[idx]
-            if total_effort > 0:
-                cumulative += effort
-                ratio = cumulative / total_effort
-            else:
-                ratio = (idx + 1) / max(len(raw_milestones), 1)
-            ratio = min(max(ratio, 0.0), 1.0)
-            offset = round((span_days - 1) * ratio)
-            tentative = start + timedelta(days=offset)
-            min_allowed = start + timedelta(days=1)
-            max_allowed = due - timedelta(days=1)
+    tpl = get_template(t)
+    if tpl:
+        span_days = max(2, due_ord - start_ord)
+        min_allowed = start_ord + 1
+        max_allowed = due_ord - 1
+        days = []
+        for ratio in tpl.ratios:
+            tentative = start_ord + round((span_days - 1) * ratio)
             if tentative < min_allowed:
                 tentative = min_allowed
             if tentative > max_allowed:
                 tentative = max_allowed
-            nd = _resolve_collisions(used, tentative, start, due)
-            used[nd] = used.get(nd, 0) + 1
-            milestones.append({"name": name, "date": nd.isoformat()})
-        a["milestones"] = milestones
-        a["due_date"] = due.isoformat()
-        a["dueDate"] = due.isoformat()
-        return
+            days.append(tentative)
+        return tpl.names, days, tpl.shares, start_ord, due_ord
 
     # Fallback to static milestone logic
     names = MILESTONES_BY_TYPE.get(t) or ["Milestone 1", "Milestone 2"]
@@ -109,23 +102,515 @@ def _generate_milestones_for_assignment(a: Dict[str, Any], used: Dict[date, int]
             "assignment": a.get("title", ""),
             "message": f"Unknown type '{t}', using generic milestones"
         })
+    days = _evenly_spaced_in_window(start_ord, due_ord, len(names))
+    return names, days, (1 / len(names),) * len(names), start_ord, due_ord
 
-    days = _evenly_spaced_in_window(start, due, len(names))
-    staggered: List[Dict[str, str]] = []
-    for idx, d in enumerate(days):
+def _current_type_version(a: Dict[str, Any]) -> Optional[str]:
+    tpl = get_template((a.get("type") or "other").lower())
+    return tpl.version if tpl else None
+
+def _set_type_version(a: Dict[str, Any]) -> None:
+    """Record the immutable type version the milestones came from (see `type_store.get_type_version`)."""
+    version = _current_type_version(a)
+    if version:
+        a["type_version"] = version
+    else:
+        a.pop("type_version", None)
+
+def _generate_milestones_for_assignment(a: Dict[str, Any], used: DayOccupancy, plan: Dict[str, Any]) -> None:
+    names, days, _, start, due = _tentative_milestones(a, plan)
+    milestones = []
+    for name, d in zip(names, days):
         nd = _resolve_collisions(used, d, start, due)
-        used[nd] = used.get(nd, 0) + 1
-        staggered.append({"name": names[idx], "date": nd.isoformat()})
-    a["milestones"] = staggered
+        used.occupy(nd)
+        milestones.append({"name": name, "date": iso_day(nd)})
+    a["milestones"] = milestones
+    a["due_date"] = iso_day(due)
+    a["dueDate"] = a["due_date"]
+    _set_type_version(a)
+
+def _iter_generate_uncached(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    assignments = plan.get("assignments", [])
+    if not isinstance(assignments, list):
+        raise ValueError("plan['assignments'] must be a list")
+    blocked = blocked_days()
+    if plan.get("scheduler") == "capacity":
+        # Hours budgets couple every assignment, so nothing is final until the whole plan is.
+        schedule_milestones_by_capacity(plan)
+        yield from assignments
+    else:
+        used = DayOccupancy(blocked=blocked)
+        for a in assignments:
+            _generate_milestones_for_assignment(a, used, plan)
+            yield a
+    plan["blocked_days_key"] = _blocked_key(blocked)
+    if plan.get("dirty_assignments"):
+        plan["dirty_assignments"] = []
+
+def iter_generate_milestones_for_plan(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Generate milestones one assignment at a time, yielding each assignment once it is placed.
 
-    a["due_date"] = due.isoformat()
-    a["dueDate"] = due.isoformat()
+    Plans whose inputs were seen before are answered from the result cache.
+    """
+    key = _result_key(plan)
+    if key is not None and _apply_cached_result(plan, key):
+        yield from plan["assignments"]
+        return
+    warnings_before = len(plan.get("warnings") or [])
+    yield from _iter_generate_uncached(plan)
+    if key is not None:
+        _store_result(plan, key, warnings_before)
 
 def generate_milestones_for_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    for _ in iter_generate_milestones_for_plan(plan):
+        pass
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Memoized results
+# ---------------------------------------------------------------------------
+
+RESULT_CACHE_SIZE = int(os.environ.get("GENERATION_CACHE_SIZE", "1024"))
+
+# key -> (milestones per assignment, due date per assignment, warnings added by the run)
+_results: "OrderedDict[str, Tuple[List[List[Dict[str, Any]]], List[str], List[Dict[str, Any]]]]" = OrderedDict()
+_results_lock = threading.Lock()
+_result_stats = {"hits": 0, "misses": 0}
+
+
+def _result_key(plan: Dict[str, Any]) -> Optional[str]:
+    """Canonical hash of everything that decides a plan's milestones, or None if it cannot be keyed.
+
+    Covers the scheduler settings, each assignment's type, title, window and
+    (for the capacity scheduler) hours, the content version of every type
+    involved, the days blocked by semester breaks, and today's date whenever
+    an assignment falls back to it.
+    Assignment ids are left out so identical assignment sets share an entry.
+    """
+    assignments = plan.get("assignments")
+    if RESULT_CACHE_SIZE <= 0 or not isinstance(assignments, list):
+        return None
+    capacity = plan.get("scheduler") == "capacity"
+    rows = []
+    types: Dict[str, Optional[str]] = {}
+    uses_today = False
+    try:
+        for a in assignments:
+            t = (a.get("type") or "other").lower()
+            due = parse_day(a.get("due_date") or a.get("dueDate") or "")
+            start_iso = a.get("start_date") or plan.get("start_date")
+            start = parse_day(start_iso) if start_iso else None
+            if start is None or start >= due:
+                uses_today = True
+            hours = float(a.get("estimated_hours") or 0) if capacity else None
+            rows.append([t, a.get("title", ""), start, due, hours])
+            if t not in types:
+                tpl = get_template(t)
+                types[t] = tpl.version if tpl else None
+    except (ValueError, TypeError, AttributeError):
+        return None  # let the generator raise its usual error
+    blocked = blocked_days()
+    payload = [
+        plan.get("scheduler") or "spread",
+        _blocked_key(blocked),
+        plan.get("hours_per_day") if capacity else None,
+        today() if uses_today else None,
+        sorted(types.items()),
+        rows,
+    ]
+    return hashlib.sha1(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _apply_cached_result(plan: Dict[str, Any], key: str) -> bool:
+    with _results_lock:
+        hit = _results.get(key)
+        if hit is None:
+            _result_stats["misses"] += 1
+            return False
+        _results.move_to_end(key)
+        _result_stats["hits"] += 1
+    milestones, dues, warnings = hit
+    for a, ms, due in zip(plan["assignments"], milestones, dues):
+        a["milestones"] = [dict(m) for m in ms]
+        a["due_date"] = due
+        a["dueDate"] = due
+        _set_type_version(a)
+    if warnings:
+        plan.setdefault("warnings", []).extend(dict(w) for w in warnings)
+    plan["blocked_days_key"] = _blocked_key(blocked_days())
+    if plan.get("dirty_assignments"):
+        plan["dirty_assignments"] = []
+    return True
+
+
+def _store_result(plan: Dict[str, Any], key: str, warnings_before: int) -> None:
+    assignments = plan["assignments"]
+    entry = (
+        [[dict(m) for m in a["milestones"]] for a in assignments],
+        [a["due_date"] for a in assignments],
+        [dict(w) for w in (plan.get("warnings") or [])[warnings_before:]],
+    )
+    with _results_lock:
+        _results[key] = entry
+        _results.move_to_end(key)
+        while len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+
+
+def generation_cache_stats() -> Dict[str, int]:
+    with _results_lock:
+        return {**_result_stats, "size": len(_results), "capacity": RESULT_CACHE_SIZE}
+
+
+def clear_generation_cache() -> None:
+    with _results_lock:
+        _results.clear()
+        _result_stats["hits"] = _result_stats["misses"] = 0
+
+
+# ---------------------------------------------------------------------------
+# Capacity scheduling
+# ---------------------------------------------------------------------------
+
+_EPS = 1e-9
+
+
+def schedule_milestones_by_capacity(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Place milestones against a daily hours budget instead of a per-day count.
+
+    Each milestone gets its effort share of the assignment's
+    ``estimated_hours``. Work is allocated day by day in earliest-due-date
+    order (ties broken by effort-ratio date); a milestone becomes ready once
+    the previous milestone of the same assignment is done.
+    A milestone lands on the later of its effort-ratio date and the day its
+    work is finished, clamped to ``[start+1, due-1]``; assignments that cannot
+    fit before their due date get a warning. No hours are allocated on days
+    blocked by a semester break, and no milestone lands on one unless the
+    whole window is blocked.
+
+    Runs in O((M + D) log M) for M milestones and D working days.
+    """
+    assignments = plan.get("assignments", [])
+    hours_per_day = float(plan.get("hours_per_day") or DEFAULT_HOURS_PER_DAY)
+    if hours_per_day <= 0:
+        raise ValueError("hours_per_day must be positive")
+
+    blocked = blocked_days()
+    # Only used for its calendar: the next or nearest day outside a break.
+    open_days = DayOccupancy(blocked=blocked) if blocked else None
+    chains = []  # per assignment: (names, target days, hours per milestone, start, due)
+    pending: List[Tuple[int, int]] = []  # (release day, assignment index) for the next milestone
+    for i, a in enumerate(assignments):
+        names, days, shares, start, due = _tentative_milestones(a, plan)
+        total_hours = max(0.0, float(a.get("estimated_hours") or 0))
+        chains.append((names, days, [total_hours * sh for sh in shares], start, due))
+        if names:
+            pending.append((start, i))
+    heapq.heapify(pending)
+
+    done: List[List[int]] = [[] for _ in assignments]
+    ready: List[Tuple[int, int, int, int, float]] = []  # (due, target day, assignment, milestone index, hours left)
+    day = 0
+    capacity = 0.0
+    while pending or ready:
+        if not ready:
+            if pending[0][0] > day:
+                day, capacity = pending[0][0], hours_per_day
+                if open_days is not None:
+                    day = open_days.next_free(day)
+        while pending and pending[0][0] <= day:
+            _, i = heapq.heappop(pending)
+            k = len(done[i])
+            heapq.heappush(ready, (chains[i][4], chains[i][1][k], i, k, chains[i][2][k]))
+        if not ready:
+            continue
+        due, target, i, k, left = heapq.heappop(ready)
+        if day >= due:
+            # Past the due date: the rest of this assignment is late and gets no more hours.
+            done[i].extend([day] * (len(chains[i][0]) - k))
+            continue
+        used = min(capacity, left)
+        capacity -= used
+        left -= used
+        if left > _EPS:
+            heapq.heappush(ready, (due, target, i, k, left))
+        else:
+            done[i].append(day)
+            if k + 1 < len(chains[i][0]):
+                heapq.heappush(ready, (due, chains[i][1][k + 1], i, k + 1, chains[i][2][k + 1]))
+        if capacity <= _EPS:
+            day, capacity = day + 1, hours_per_day
+            if open_days is not None:
+                day = open_days.next_free(day)
+
+    for a, (names, days, hours, start, due), finished in zip(assignments, chains, done):
+        milestones = []
+        late = False
+        for name, target, h, fin in zip(names, days, hours, finished):
+            nd = max(target, fin)
+            if nd > due - 1:
+                late = True
+            nd = max(start + 1, min(due - 1, nd))
+            if open_days is not None:
+                nd = _resolve_collisions(open_days, nd, start, due)
+            milestones.append({"name": name, "date": iso_day(nd), "hours": round(h, 2)})
+        if late:
+            plan.setdefault("warnings", []).append({
+                "assignment": a.get("title", ""),
+                "message": f"Not enough time at {hours_per_day:g} hours per day to finish before the due date"
+            })
+        a["milestones"] = milestones
+        a["due_date"] = iso_day(due)
+        a["dueDate"] = a["due_date"]
+        _set_type_version(a)
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Incremental regeneration
+# ---------------------------------------------------------------------------
+
+def _milestone_days(a: Dict[str, Any]) -> List[int]:
+    return [parse_day(m["date"]) for m in a.get("milestones") or []]
+
+
+def iter_regenerate_milestones_for_plan(plan: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Regenerate only what changed since the last run.
+
+    Yields ``(assignment, recomputed)`` for every assignment, in plan order,
+    as soon as its milestones are final. Assignments listed in
+    ``plan["dirty_assignments"]``, without milestones, or generated from an
+    older version of their type are recomputed. When the days blocked by
+    semester breaks differ from those the plan was last generated against
+    (``plan["blocked_days_key"]``), a break was added, moved or removed and
+    every assignment is recomputed.
+    Every other assignment keeps its milestones unless a day inside its
+    window changed occupancy earlier in the run, in which case it may have
+    been displaced and is recomputed too. Untouched assignments are replayed
+    into the occupancy index straight from their stored dates, so the result
+    matches a full `generate_milestones_for_plan` run.
+    """
     assignments = plan.get("assignments", [])
     if not isinstance(assignments, list):
         raise ValueError("plan['assignments'] must be a list")
-    used: Dict[date, int] = {}
+    dirty = set(plan.get("dirty_assignments") or [])
+    blocked = blocked_days()
+    # Hours budgets couple every assignment, a changed break can move any
+    # milestone, and a plan with nothing to reuse may be answered from the
+    # result cache, so all three take the full path.
+    if (
+        plan.get("scheduler") == "capacity"
+        or plan.get("blocked_days_key") != _blocked_key(blocked)
+        or all(a.get("id") in dirty or "milestones" not in a for a in assignments)
+    ):
+        for a in iter_generate_milestones_for_plan(plan):
+            yield a, True
+        return
+    used = DayOccupancy(blocked=blocked)
+    changed = DayOccupancy()  # days whose occupancy differs from the previous run
     for a in assignments:
+        start, due = _assignment_window(a, plan)
+        old_days = _milestone_days(a)
+        stale = (
+            a.get("id") in dirty
+            or "milestones" not in a
+            or a.get("type_version") != _current_type_version(a)
+            or changed.any_between(start + 1, due - 1)
+        )
+        if not stale:
+            for d in old_days:
+                used.occupy(d)
+            yield a, False
+            continue
         _generate_milestones_for_assignment(a, used, plan)
-    return plan
+        new_days = _milestone_days(a)
+        if new_days != old_days:
+            for d in set(old_days).symmetric_difference(new_days):
+                changed.occupy(d)
+            for d in set(old_days).intersection(new_days):
+                if old_days.count(d) != new_days.count(d):
+                    changed.occupy(d)
+        yield a, True
+    plan["dirty_assignments"] = []
+
+
+def regenerate_milestones_for_plan(plan: Dict[str, Any]) -> int:
+    """Incremental regeneration; returns how many assignments were recomputed."""
+    return sum(recomputed for _, recomputed in iter_regenerate_milestones_for_plan(plan))
+
+
+def mark_assignment_dirty(plan: Dict[str, Any], assignment_id: str) -> None:
+    dirty = plan.setdefault("dirty_assignments", [])
+    if assignment_id not in dirty:
+        dirty.append(assignment_id)
+
+
+def remove_assignment(plan: Dict[str, Any], assignment_id: str) -> bool:
+    """Drop an assignment and mark later assignments that may take over its days as dirty."""
+    assignments = plan.get("assignments", [])
+    for idx, a in enumerate(assignments):
+        if a.get("id") == assignment_id:
+            break
+    else:
+        return False
+    freed = DayOccupancy(_milestone_days(assignments.pop(idx)))
+    for later in assignments[idx:]:
+        if "milestones" not in later:
+            continue
+        try:
+            start, due = _assignment_window(later, plan)
+        except ValueError:
+            continue
+        if freed.any_between(start + 1, due - 1):
+            mark_assignment_dirty(plan, later.get("id"))
+    dirty = plan.get("dirty_assignments")
+    if dirty and assignment_id in dirty:
+        dirty.remove(assignment_id)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Batch generation (whole cohorts)
+# ---------------------------------------------------------------------------
+
+def _batch_template(t: str, templates: Dict[str, Tuple[Sequence[str], Optional[Sequence[float]]]]):
+    """Resolve (names, ratios) for a type once per batch; ratios is None for the static fallback."""
+    cached = templates.get(t)
+    if cached is None:
+        tpl = get_template(t)
+        if tpl:
+            cached = (tpl.names, tpl.ratios)
+        else:
+            cached = (MILESTONES_BY_TYPE.get(t) or ["Milestone 1", "Milestone 2"], None)
+        templates[t] = cached
+    return cached
+
+
+def generate_milestones_for_plans(plans: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Generate milestones for many plans at once.
+
+    Produces exactly what `generate_milestones_for_plan` would for each plan,
+    but computes the effort-ratio offsets and the `[start+1, due-1]` clamping
+    for every milestone in the batch as NumPy operations over day ordinals.
+    Only collision resolution, which depends on the order milestones are
+    placed within a plan, stays a per-plan loop.
+
+    Plans are mutated in place. Returns ``{plan_index: error message}`` for
+    plans that could not be generated; those plans are left untouched.
+    """
+    if np is None:
+        errors: Dict[int, str] = {}
+        for i, plan in enumerate(plans):
+            try:
+                generate_milestones_for_plan(plan)
+            except ValueError as e:
+                errors[i] = str(e)
+        return errors
+
+    today_ord = today()
+    templates: Dict[str, Tuple[Sequence[str], Optional[Sequence[float]]]] = {}
+    errors = {}
+
+    # One row per assignment: (plan index, assignment, type, names, start, due, is_dynamic)
+    rows: List[Tuple[int, Dict[str, Any], str, Sequence[str], int, int, bool]] = []
+    for pi, plan in enumerate(plans):
+        assignments = plan.get("assignments", [])
+        if not isinstance(assignments, list):
+            errors[pi] = "plan['assignments'] must be a list"
+            continue
+        if plan.get("scheduler") == "capacity":
+            try:
+                generate_milestones_for_plan(plan)
+            except ValueError as e:
+                errors[pi] = str(e)
+            continue
+        plan_rows = []
+        try:
+            for a in assignments:
+                t = (a.get("type") or "other").lower()
+                due_iso = a.get("due_date") or a.get("dueDate")
+                if not due_iso:
+                    raise ValueError("assignment missing due date (need 'due_date' or 'dueDate')")
+                due = parse_day(due_iso)
+                start_iso = a.get("start_date") or plan.get("start_date")
+                start = parse_day(start_iso) if start_iso else today_ord
+                if start >= due:
+                    start = max(today_ord, due - 14)
+                names, ratios = _batch_template(t, templates)
+                plan_rows.append((pi, a, t, names, start, due, ratios is not None))
+        except ValueError as e:
+            errors[pi] = str(e)
+            continue
+        rows.extend(plan_rows)
+
+    # Flatten every milestone of every assignment into parallel arrays.
+    counts = np.fromiter((len(r[3]) for r in rows), dtype=np.int64, count=len(rows))
+    total = int(counts.sum())
+    row_of = np.repeat(np.arange(len(rows), dtype=np.int64), counts)
+    first = np.cumsum(counts) - counts
+    k = np.arange(total, dtype=np.int64) - np.repeat(first, counts)  # 0-based index within assignment
+
+    starts = np.fromiter((r[4] for r in rows), dtype=np.int64, count=len(rows))[row_of]
+    dues = np.fromiter((r[5] for r in rows), dtype=np.int64, count=len(rows))[row_of]
+    dynamic = np.fromiter((r[6] for r in rows), dtype=bool, count=len(rows))[row_of]
+    ratios = np.fromiter(
+        (x for r in rows for x in (templates[r[2]][1] or (0.0,) * len(r[3]))),
+        dtype=np.float64,
+        count=total,
+    )
+
+    # Dynamic types: offset by cumulative effort ratio, clamp to [start+1, due-1].
+    span = np.maximum(2, dues - starts)
+    dyn = starts + np.rint((span - 1) * ratios).astype(np.int64)
+    dyn = np.minimum(np.maximum(dyn, starts + 1), dues - 1)
+
+    # Static fallback: evenly spaced, then pushed forward so dates strictly increase.
+    window = dues - starts
+    last_day = np.maximum(1, window - 1)
+    n = counts[row_of]
+    pos = np.rint((k + 1) * (last_day / (n + 1))).astype(np.int64)
+    pos = np.maximum(1, np.minimum(last_day, pos))
+    big = int(pos.max(initial=0)) + int(counts.max(initial=0)) + 1
+    seg = row_of * big
+    pushed = np.maximum.accumulate(pos - k + seg) - seg + k
+    even = starts + pos
+    even = np.where(k == 0, even, np.minimum(dues - 1, starts + pushed))
+
+    tentative = np.where(dynamic, dyn, even).tolist()
+    degenerate = (window < 2) & ~dynamic
+
+    blocked = blocked_days()
+    used_by_plan: Dict[int, DayOccupancy] = {}
+    cursor = 0
+    for pi, a, t, names, start, due, is_dynamic in rows:
+        count = len(names)
+        days = tentative[cursor:cursor + count]
+        if count and degenerate[cursor]:
+            days = _evenly_spaced_in_window(start, due, count)
+        cursor += count
+        if not is_dynamic and t not in MILESTONES_BY_TYPE:
+            plans[pi].setdefault("warnings", []).append({
+                "assignment": a.get("title", ""),
+                "message": f"Unknown type '{t}', using generic milestones"
+            })
+        used = used_by_plan.get(pi)
+        if used is None:
+            used = used_by_plan[pi] = DayOccupancy(blocked=blocked)
+        milestones = []
+        for name, d in zip(names, days):
+            nd = _resolve_collisions(used, d, start, due)
+            used.occupy(nd)
+            milestones.append({"name": name, "date": iso_day(nd)})
+        a["milestones"] = milestones
+        a["due_date"] = iso_day(due)
+        a["dueDate"] = a["due_date"]
+        _set_type_version(a)
+    blocked_key = _blocked_key(blocked)
+    for pi, plan in enumerate(plans):
+        if pi in errors or plan.get("scheduler") == "capacity":
+            continue
+        plan["blocked_days_key"] = blocked_key
+        if plan.get("dirty_assignments"):
+            plan["dirty_assignments"] = []
+    return errors
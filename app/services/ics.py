@@ -1,7 +1,9 @@
 from icalendar import Calendar, Event
-from datetime import datetime
+from datetime import date
 from io import BytesIO
 
+from app.services.dates import parse_day
+
 def build_plan_ics(plan: dict) -> BytesIO:
     cal = Calendar()
     cal.add("prodid", "-//UWA Assignment Planner//CITS3200//")
@@ -11,7 +13,7 @@ def build_plan_ics(plan: dict) -> BytesIO:
         unit = a.get("unit", "")
         title = a.get("title", "")
         for m in a.get("milestones", []):
-            d = datetime.fromisoformat(m["date"]).date()
+            d = date.fromordinal(parse_day(m["date"]))
             ev = Event()
             ev.add("summary", f"{unit}: {title} — {m['name']}")
             ev.add("dtstart", d)  # all-day
@@ -0,0 +1,166 @@
+"""Day occupancy index used by the milestone generator.
+
+Days are day ordinals (`date.toordinal()`). Occupied days are kept as bits
+of one Python integer, so "nearest free day in a window" is a couple of
+shifts and masks instead of a probe loop, and its cost does not depend on
+how crowded the window is.
+
+`BlockedDays` is the same kind of bitmap for days that must not get a
+milestone at all (semester breaks, exam weeks); an occupancy index built
+with one treats those days as permanently taken.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+# Headroom kept below the first day seen so earlier days rarely force a rebase.
+_REBASE_MARGIN = 366
+
+
+class BlockedDays:
+    """Immutable set of day ordinals, stored as one integer bitmap, with O(1) membership."""
+
+    __slots__ = ("bits", "base")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()) -> None:
+        spans = [(lo, hi) for lo, hi in ranges if lo <= hi]
+        self.base = min((lo for lo, _ in spans), default=0)
+        bits = 0
+        for lo, hi in spans:
+            bits |= ((1 << (hi - lo + 1)) - 1) << (lo - self.base)
+        self.bits = bits
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def is_blocked(self, day: int) -> bool:
+        return day >= self.base and bool((self.bits >> (day - self.base)) & 1)
+
+    def aligned(self, base: int) -> int:
+        """The bitmap re-based so that bit 0 is day `base`."""
+        if self.base >= base:
+            return self.bits << (self.base - base)
+        return self.bits >> (base - self.base)
+
+
+class DayOccupancy:
+    """Milestone counts per day with O(1) "is free" and fast nearest-free lookup."""
+
+    __slots__ = ("_bits", "_counts", "_base", "_blocked", "_blocked_bits")
+
+    def __init__(self, days: Iterable[int] = (), blocked: Optional[BlockedDays] = None) -> None:
+        self._bits = 0
+        self._counts: Dict[int, int] = {}
+        self._base: Optional[int] = None
+        # Blocked days, aligned to `_base`; never counted, never released.
+        self._blocked = blocked or None
+        self._blocked_bits = 0
+        for d in days:
+            self.occupy(d)
+
+    def _offset(self, day: int) -> int:
+        if self._base is None:
+            self._base = day - _REBASE_MARGIN
+            if self._blocked is not None:
+                self._blocked_bits = self._blocked.aligned(self._base)
+        elif day < self._base:
+            new_base = day - _REBASE_MARGIN
+            self._bits <<= self._base - new_base
+            self._base = new_base
+            if self._blocked is not None:
+                self._blocked_bits = self._blocked.aligned(new_base)
+        return day - self._base
+
+    def _taken(self) -> int:
+        return self._bits | self._blocked_bits
+
+    def count(self, day: int) -> int:
+        return self._counts.get(day, 0)
+
+    def is_free(self, day: int) -> bool:
+        if day in self._counts:
+            return False
+        return self._blocked is None or not self._blocked.is_blocked(day)
+
+    def occupy(self, day: int) -> None:
+        n = self._counts.get(day, 0)
+        if n == 0:
+            # Offset first: it may rebase `_bits`, which `|=` would read beforehand.
+            offset = self._offset(day)
+            self._bits |= 1 << offset
+        self._counts[day] = n + 1
+
+    def release(self, day: int) -> None:
+        n = self._counts.get(day, 0)
+        if n == 0:
+            return
+        if n == 1:
+            del self._counts[day]
+            offset = self._offset(day)
+            self._bits &= ~(1 << offset)
+        else:
+            self._counts[day] = n - 1
+
+    def any_between(self, lo: int, hi: int) -> bool:
+        """True if any day in `[lo, hi]` is occupied."""
+        if lo > hi or not self._counts:
+            return False
+        mask = (1 << (hi - lo + 1)) - 1
+        return bool((self._bits >> self._offset(lo)) & mask)
+
+    def next_free(self, day: int) -> int:
+        """First free day on or after `day`."""
+        offset = self._offset(day)
+        free = ~(self._taken() >> offset)
+        return day + (free & -free).bit_length() - 1
+
+    def prev_free(self, day: int, lo: int) -> Optional[int]:
+        """Last free day in `[lo, day]`, or None if every day there is taken."""
+        if day < lo:
+            return None
+        start = self._offset(lo)
+        width = day - lo + 1
+        mask = (1 << width) - 1
+        free = ~(self._taken() >> start) & mask
+        if not free:
+            return None
+        return lo + free.bit_length() - 1
+
+    def nearest_free(self, day: int, lo: int, hi: int) -> Optional[int]:
+        """Closest free day to `day` within `[lo, hi]`; ties go to the later day."""
+        if lo > hi:
+            return None
+        day = min(max(day, lo), hi)
+        if self.is_free(day):
+            return day
+        f = self.next_free(day)
+        b = self.prev_free(day, lo)
+        if f > hi:
+            return b
+        if b is None or f - day <= day - b:
+            return f
+        return b
+
+    def nearest_unblocked(self, day: int, lo: int, hi: int) -> Optional[int]:
+        """Closest day to `day` within `[lo, hi]` that is not blocked, occupied or not.
+
+        Ties go to the later day; None if every day there is blocked.
+        """
+        if lo > hi:
+            return None
+        day = min(max(day, lo), hi)
+        if self._blocked is None or not self._blocked.is_blocked(day):
+            return day
+        start = self._offset(lo)
+        open_bits = ~(self._blocked_bits >> start) & ((1 << (hi - lo + 1)) - 1)
+        if not open_bits:
+            return None
+        pos = day - lo
+        after = open_bits >> pos
+        f = day + (after & -after).bit_length() - 1 if after else None
+        before = open_bits & ((1 << pos) - 1)
+        b = lo + before.bit_length() - 1 if before else None
+        if f is None:
+            return b
+        if b is None or f - day <= day - b:
+            return f
+        return b
@@ -1,40 +1,38 @@
 from weasyprint import HTML, CSS
 from io import BytesIO
 from textwrap import dedent
-from datetime import date, datetime
+from datetime import date
+from functools import lru_cache
 import html as _html
 from itertools import groupby
 
+from app.services.dates import parse_day
+
 def _esc(s) -> str:
     return _html.escape("" if s is None else str(s))
 
-def _fmt_date(s: str) -> str:
-    if not s:
-        return ""
-    try:
-        if len(s) == 10:
-            dt = datetime.strptime(s, "%Y-%m-%d")
-        else:
-            dt = datetime.fromisoformat(s)
-        return dt.strftime("%a, %d %b %Y")
-    except Exception:
-        return s
-
-def _parse_date(s: str) -> date | None:
+@lru_cache(maxsize=4096)
+def _human_day(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime("%a, %d %b %Y")
+
+@lru_cache(maxsize=4096)
+def _iso_week(ordinal: int) -> tuple[int, int]:
+    iso_year, iso_week, _ = date.fromordinal(ordinal).isocalendar()
+    return iso_year, iso_week
+
+def _parse_day(s: str) -> int | None:
     if not s:
         return None
     try:
-        if len(s) == 10:
-            return datetime.strptime(s, "%Y-%m-%d").date()
-        return datetime.fromisoformat(s).date()
-    except Exception:
+        return parse_day(s)
+    except ValueError:
         return None
 
 def _collect_summary(assignments):
     total_assignments = len(assignments)
     total_milestones = sum(len(a.get("milestones") or []) for a in assignments)
-    all_dues = sorted([a.get("due_date") for a in assignments if a.get("due_date")])
-    date_range = f"{_esc(_fmt_date(all_dues[0]))} – {_esc(_fmt_date(all_dues[-1]))}" if all_dues else "—"
+    all_dues = sorted(d for d in (_parse_day(a.get("due_date")) for a in assignments) if d is not None)
+    date_range = f"{_esc(_human_day(all_dues[0]))} – {_esc(_human_day(all_dues[-1]))}" if all_dues else "—"
     return total_assignments, total_milestones, date_range
 
 def _all_milestones(assignments):
@@ -45,38 +43,32 @@ def _all_milestones(assignments):
         title = a.get("title") or ""
         atype = (a.get("type") or "").title()
         for m in (a.get("milestones") or []):
-            d = _parse_date(m.get("date"))
-            if not d:  # skip bad dates
+            d = _parse_day(m.get("date"))
+            if d is None:  # skip bad dates
                 continue
             items.append({
-                "date": d,
-                "date_str": d.isoformat(),
-                "date_human": _fmt_date(d.isoformat()),
+                "day": d,
+                "date_human": _human_day(d),
                 "unit": unit,
                 "title": title,
                 "type": atype,
                 "milestone": m.get("name") or "",
             })
     # sort by date
-    items.sort(key=lambda x: x["date"])
+    items.sort(key=lambda x: x["day"])
     return items
 
 def _group_by_iso_week(items):
     """Group flattened milestone items into ISO year-week buckets."""
     # key as (iso_year, iso_week)
-    def keyer(it):
-        iso_year, iso_week, _ = it["date"].isocalendar()
-        return (iso_year, iso_week)
     grouped = []
-    for (y, w), chunk in groupby(items, keyer):
+    for (y, w), chunk in groupby(items, lambda it: _iso_week(it["day"])):
         chunk = list(chunk)
         # Pretty week heading like "2025 • Week 42 (13–19 Oct)"
-        start_of_week = chunk[0]["date"]
-        # compute Monday..Sunday range
-        weekday = start_of_week.weekday()  # Mon=0
-        monday = start_of_week if weekday == 0 else start_of_week.fromordinal(start_of_week.toordinal() - weekday)
-        sunday = monday.fromordinal(monday.toordinal() + 6)
-        heading = f"{y} • Week {w:02d} ({_fmt_date(monday.isoformat())} – {_fmt_date(sunday.isoformat())})"
+        start_of_week = chunk[0]["day"]
+        # compute Monday..Sunday range (ordinal 1 is a Monday)
+        monday = start_of_week - (start_of_week - 1) % 7
+        heading = f"{y} • Week {w:02d} ({_human_day(monday)} – {_human_day(monday + 6)})"
         grouped.append({
             "iso_year": y,
             "iso_week": w,
@@ -0,0 +1,266 @@
+"""Storage for study plans.
+
+Routes reach plans through a `PlanStore`:
+
+* `MemoryPlanStore` keeps them in a dict (``app.config["PLANS"]``). This is
+  the default; plans are private to the process and lost on restart.
+* `SQLitePlanStore` keeps them in a SQLite database in WAL mode, so every
+  worker on the host shares the same plans and they survive restarts.
+  Enabled by pointing ``PLAN_DB`` at the database file.
+
+Short read-modify-write route handlers use `editing`, which in SQLite runs
+in a ``BEGIN IMMEDIATE`` transaction so concurrent edits from other workers
+are serialized rather than lost. Long ones (milestone generation) work on a
+private copy from `snapshot` and save it with `put_if_unchanged`, which only
+writes if nobody else saved the plan in the meantime; every save bumps the
+plan's revision.
+"""
+
+import abc
+import copy
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Plan = Dict[str, Any]
+# (private copy of a plan, its revision)
+Snapshot = Tuple[Plan, int]
+
+
+class PlanStore(abc.ABC):
+    """Interface shared by the plan backends."""
+
+    @abc.abstractmethod
+    def get(self, plan_id: str) -> Optional[Plan]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_many(self, plan_ids: Iterable[str]) -> Dict[str, Plan]:
+        """Plans by id; unknown ids are left out."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ids(self) -> List[str]:
+        """Every plan id, oldest first."""
+        raise NotImplementedError
+
+    def put(self, plan: Plan) -> None:
+        self.put_many([plan])
+
+    @abc.abstractmethod
+    def put_many(self, plans: Iterable[Plan]) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, plan_id: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def editing(self, plan_id: str) -> ContextManager[Optional[Plan]]:
+        """Context manager yielding the plan (None if unknown); saves it if the block completes."""
+        raise NotImplementedError
+
+    def snapshot(self, plan_id: str) -> Optional[Snapshot]:
+        return self.snapshot_many([plan_id]).get(plan_id)
+
+    @abc.abstractmethod
+    def snapshot_many(self, plan_ids: Iterable[str]) -> Dict[str, Snapshot]:
+        """Private copies of plans with their revisions; unknown ids are left out."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put_if_unchanged(self, plan: Plan, revision: int) -> bool:
+        """Save `plan` only if the stored plan is still at `revision`; False if it changed or is gone."""
+        raise NotImplementedError
+
+
+class MemoryPlanStore(PlanStore):
+    """Plans in a dict owned by one process, with one lock per plan."""
+
+    def __init__(self, plans: Optional[Dict[str, Plan]] = None) -> None:
+        self._plans = plans if plans is not None else {}
+        self._revisions: Dict[str, int] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, plan_id: str) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(plan_id)
+            if lock is None:
+                lock = self._locks[plan_id] = threading.RLock()
+            return lock
+
+    def _saved(self, plan_id: str) -> None:
+        self._revisions[plan_id] = self._revisions.get(plan_id, 0) + 1
+
+    def get(self, plan_id: str) -> Optional[Plan]:
+        return self._plans.get(plan_id)
+
+    def get_many(self, plan_ids: Iterable[str]) -> Dict[str, Plan]:
+        return {pid: self._plans[pid] for pid in plan_ids if pid in self._plans}
+
+    def ids(self) -> List[str]:
+        return list(self._plans)
+
+    def put_many(self, plans: Iterable[Plan]) -> None:
+        for plan in plans:
+            plan_id = plan["plan_id"]
+            with self._lock(plan_id):
+                self._plans[plan_id] = plan
+                self._saved(plan_id)
+
+    def delete(self, plan_id: str) -> bool:
+        with self._lock(plan_id):
+            self._revisions.pop(plan_id, None)
+            found = self._plans.pop(plan_id, None) is not None
+        with self._locks_guard:
+            self._locks.pop(plan_id, None)
+        return found
+
+    @contextmanager
+    def editing(self, plan_id: str) -> Iterator[Optional[Plan]]:
+        if plan_id not in self._plans:
+            yield None
+            return
+        with self._lock(plan_id):
+            plan = self._plans.get(plan_id)
+            yield plan
+            if plan is not None:
+                self._saved(plan_id)
+
+    def snapshot_many(self, plan_ids: Iterable[str]) -> Dict[str, Snapshot]:
+        found: Dict[str, Snapshot] = {}
+        for plan_id in plan_ids:
+            if plan_id not in self._plans:
+                continue
+            with self._lock(plan_id):
+                plan = self._plans.get(plan_id)
+                if plan is not None:
+                    found[plan_id] = (copy.deepcopy(plan), self._revisions.get(plan_id, 0))
+        return found
+
+    def put_if_unchanged(self, plan: Plan, revision: int) -> bool:
+        plan_id = plan["plan_id"]
+        with self._lock(plan_id):
+            if plan_id not in self._plans or self._revisions.get(plan_id, 0) != revision:
+                return False
+            self._plans[plan_id] = plan
+            self._saved(plan_id)
+            return True
+
+
+class SQLitePlanStore(PlanStore):
+    """Plans as JSON documents in one SQLite table, shared by every process on the host.
+
+    Each thread (and each forked worker) opens its own connection; the fixed
+    SQL strings below are compiled once per connection and reused from
+    sqlite3's statement cache.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS plans ("
+        " plan_id TEXT PRIMARY KEY,"
+        " doc TEXT NOT NULL CHECK (json_valid(doc)),"
+        " revision INTEGER NOT NULL DEFAULT 0,"
+        " updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+        ")"
+    )
+    _GET = "SELECT doc FROM plans WHERE plan_id = ?"
+    # One statement for any number of ids: they are passed as a JSON array.
+    _GET_MANY = "SELECT plan_id, doc, revision FROM plans WHERE plan_id IN (SELECT value FROM json_each(?))"
+    _IDS = "SELECT plan_id FROM plans ORDER BY rowid"
+    _PUT = (
+        "INSERT INTO plans (plan_id, doc) VALUES (?, json(?))"
+        " ON CONFLICT (plan_id) DO UPDATE SET doc = excluded.doc, revision = revision + 1,"
+        " updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+    )
+    # A single statement, so it needs no explicit transaction.
+    _PUT_IF_UNCHANGED = (
+        "UPDATE plans SET doc = json(?), revision = revision + 1,"
+        " updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+        " WHERE plan_id = ? AND revision = ?"
+    )
+    _DELETE = "DELETE FROM plans WHERE plan_id = ?"
+
+    def __init__(self, path: Path, busy_timeout_ms: int = 5000) -> None:
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None or local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly below.
+            conn = sqlite3.connect(str(self.path), isolation_level=None, cached_statements=32)
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(self._SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _dump(plan: Plan) -> str:
+        return json.dumps(plan, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def get(self, plan_id: str) -> Optional[Plan]:
+        row = self._conn().execute(self._GET, (plan_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, plan_ids: Iterable[str]) -> Dict[str, Plan]:
+        rows = self._conn().execute(self._GET_MANY, (json.dumps(list(plan_ids)),)).fetchall()
+        return {pid: json.loads(doc) for pid, doc, _ in rows}
+
+    def ids(self) -> List[str]:
+        return [pid for (pid,) in self._conn().execute(self._IDS)]
+
+    def put_many(self, plans: Iterable[Plan]) -> None:
+        rows = [(plan["plan_id"], self._dump(plan)) for plan in plans]
+        with self._transaction() as conn:
+            conn.executemany(self._PUT, rows)
+
+    def delete(self, plan_id: str) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(self._DELETE, (plan_id,)).rowcount > 0
+
+    @contextmanager
+    def editing(self, plan_id: str) -> Iterator[Optional[Plan]]:
+        with self._transaction() as conn:
+            row = conn.execute(self._GET, (plan_id,)).fetchone()
+            plan = json.loads(row[0]) if row else None
+            yield plan
+            if plan is not None:
+                conn.execute(self._PUT, (plan_id, self._dump(plan)))
+
+    def snapshot_many(self, plan_ids: Iterable[str]) -> Dict[str, Snapshot]:
+        rows = self._conn().execute(self._GET_MANY, (json.dumps(list(plan_ids)),)).fetchall()
+        return {pid: (json.loads(doc), revision) for pid, doc, revision in rows}
+
+    def put_if_unchanged(self, plan: Plan, revision: int) -> bool:
+        cursor = self._conn().execute(self._PUT_IF_UNCHANGED, (self._dump(plan), plan["plan_id"], revision))
+        return cursor.rowcount > 0
+
+
+def from_config(config: Dict[str, Any]) -> PlanStore:
+    """SQLite store when ``PLAN_DB`` is set (in the config or environment), else in-memory."""
+    path = config.get("PLAN_DB") or os.environ.get("PLAN_DB")
+    if path:
+        return SQLitePlanStore(Path(path))
+    return MemoryPlanStore(config.setdefault("PLANS", {}))
@@ -1,102 +1,161 @@
+"""Semester catalogue: the documents under ``data/semesters``.
+
+Caching, change detection and writes are handled by
+`document_store.DocumentStore`; this module adds validation and the
+indexes the API and the generator need: semesters ordered by start date,
+an interval index for date lookups and the bitmap of days blocked by
+breaks.
+"""
+
 import os
-import json
-from pathlib import Path
-from typing import Any, Dict, List
+import re
+from bisect import bisect_right
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-try:
-    import yaml  # type: ignore
-except ImportError:  # pragma: no cover - optional dependency
-    yaml = None
+from app.services import document_store
+from app.services.dates import parse_day
+from app.services.document_store import Catalog, DocumentStore
+from app.services.occupancy import BlockedDays
 
 _BASE_DIR = Path(__file__).resolve().parent.parent
 _DEFAULT_SEMESTERS_DIR = _BASE_DIR / "data" / "semesters"
 SEMESTERS_DIR = Path(os.environ.get("SEMESTERS_DIR", _DEFAULT_SEMESTERS_DIR))
-_cache: Dict[str, Any] = {"items": [], "mtime": 0.0}
+# Seconds between directory scans when no file watcher is running.
+POLL_INTERVAL = float(os.environ.get("SEMESTERS_POLL_INTERVAL", "1.0"))
+# Ids become file names, so only these characters are allowed.
+_ID_PATTERN = re.compile(r"^[a-z0-9_-]+$")
 
 
-def _dir_mtime(path: Path) -> float:
-    mt = path.stat().st_mtime if path.exists() else 0.0
-    for child in path.glob("*"):
-        try:
-            mt = max(mt, child.stat().st_mtime)
-        except OSError:
-            continue
-    return mt
-
-
-def _load_file(path: Path) -> Dict[str, Any]:
-    text = path.read_text(encoding="utf-8")
-    if path.suffix.lower() in {".yaml", ".yml"}:
-        if not yaml:
-            raise RuntimeError("PyYAML not installed — run `pip install pyyaml`")
-        return yaml.safe_load(text) or {}
-    return json.loads(text)
-
-
-def _dump_file(path: Path, payload: Dict[str, Any]) -> None:
-    if path.suffix.lower() in {".yaml", ".yml"} and yaml:
-        path.write_text(
-            yaml.safe_dump(payload, sort_keys=False, allow_unicode=True),
-            encoding="utf-8",
-        )
-    else:
-        path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+def _slugify(value: str) -> str:
+    return document_store.slugify(value, "semester")
 
 
-def _slugify(value: str) -> str:
-    cleaned = "".join(ch.lower() if ch.isalnum() else "-" for ch in value.strip())
-    while "--" in cleaned:
-        cleaned = cleaned.replace("--", "-")
-    return cleaned.strip("-") or "semester"
+def _ordered(by_id: Mapping[str, Dict[str, Any]]) -> Tuple[Dict[str, Any], ...]:
+    return tuple(sorted(by_id.values(), key=lambda item: str(item.get("start_date") or "")))
+
 
+class _Intervals:
+    """Semesters as day-ordinal spans sorted by start, with the running maximum of the ends."""
 
-def _refresh_cache() -> None:
-    items: List[Dict[str, Any]] = []
-    if SEMESTERS_DIR.exists():
-        for file in SEMESTERS_DIR.glob("*.*"):
-            if file.suffix.lower() not in {".yaml", ".yml", ".json"}:
+    __slots__ = ("spans", "starts", "reach")
+
+    def __init__(self, by_id: Mapping[str, Dict[str, Any]]) -> None:
+        spans = []
+        for item in by_id.values():
+            try:
+                start = parse_day(str(item.get("start_date") or ""))
+                end = parse_day(str(item.get("end_date") or ""))
+            except ValueError:
+                continue
+            if end >= start:
+                spans.append((start, end, item))
+        spans.sort(key=lambda span: (span[0], span[2]["id"]))
+        reach: List[int] = []
+        for _, end, _ in spans:
+            reach.append(max(end, reach[-1]) if reach else end)
+        self.spans: Tuple[Tuple[int, int, Dict[str, Any]], ...] = tuple(spans)
+        self.starts: Tuple[int, ...] = tuple(span[0] for span in spans)
+        self.reach: Tuple[int, ...] = tuple(reach)
+
+    def at(self, day: int) -> Optional[Dict[str, Any]]:
+        i = bisect_right(self.starts, day) - 1
+        # Walk back over earlier starts only while one of them can still reach `day`.
+        while i >= 0 and self.reach[i] >= day:
+            _, end, item = self.spans[i]
+            if end >= day:
+                return item
+            i -= 1
+        return None
+
+
+def _blocked(by_id: Mapping[str, Dict[str, Any]]) -> BlockedDays:
+    """Every day inside a break of any semester; malformed breaks are skipped."""
+    ranges = []
+    for item in by_id.values():
+        for brk in item.get("breaks") or []:
+            if not isinstance(brk, dict):
                 continue
             try:
-                payload = _load_file(file)
-            except Exception:
+                ranges.append((parse_day(str(brk.get("start_date") or "")), parse_day(str(brk.get("end_date") or ""))))
+            except ValueError:
                 continue
-            sid = (payload.get("id") or file.stem).strip()
-            payload["id"] = sid
-            items.append(payload)
-    items.sort(key=lambda item: item.get("start_date") or "")
-    _cache["items"] = items
+    return BlockedDays(ranges)
+
+
+def _make_store(directory: Path) -> DocumentStore:
+    return DocumentStore(
+        directory,
+        name="semesters",
+        indexes={"ordered": _ordered, "intervals": _Intervals, "blocked": _blocked},
+        write_suffix=".yaml",
+        slug_default="semester",
+        poll_interval=POLL_INTERVAL,
+    )
+
+
+_store = _make_store(SEMESTERS_DIR)
 
 
-def _ensure_fresh() -> None:
-    mt = _dir_mtime(SEMESTERS_DIR)
-    if mt > _cache["mtime"]:
-        _refresh_cache()
-        _cache["mtime"] = mt
+def _ensure_fresh() -> Catalog:
+    return _store.catalog()
+
+
+def cache_validators(sid: Optional[str] = None) -> Optional[Tuple[str, float]]:
+    """(etag, last modified) for all semesters, or for one (None if unknown)."""
+    return _store.validators(sid)
 
 
 def list_semesters() -> List[Dict[str, Any]]:
-    _ensure_fresh()
-    return list(_cache.get("items", []))
+    return list(_ensure_fresh().indexes["ordered"])
 
 
-def get_semester(sid: str) -> Dict[str, Any] | None:
-    _ensure_fresh()
-    for item in _cache.get("items", []):
-        if item.get("id") == sid:
-            return item
-    return None
+def get_semester(sid: str) -> Optional[Dict[str, Any]]:
+    return _ensure_fresh().by_id.get(sid)
 
 
-def save_semester(doc: Dict[str, Any]) -> Dict[str, Any]:
-    SEMESTERS_DIR.mkdir(parents=True, exist_ok=True)
-    name = (doc.get("name") or "").strip()
-    start_date = (doc.get("start_date") or "").strip()
-    end_date = (doc.get("end_date") or "").strip()
-    detail = (doc.get("detail") or "").strip()
+def semester_at(day: int) -> Optional[Dict[str, Any]]:
+    """The semester containing day ordinal `day`; the latest-starting one if several do."""
+    return _ensure_fresh().indexes["intervals"].at(day)
+
+
+def blocked_days() -> BlockedDays:
+    """Days no milestone may be placed on: the union of every semester's breaks."""
+    return _ensure_fresh().indexes["blocked"]
+
+
+def _clean_breaks(raw: Any) -> List[Dict[str, str]]:
+    if raw is None:
+        return []
+    if not isinstance(raw, list):
+        raise ValueError("breaks must be a list")
+    breaks = []
+    for i, brk in enumerate(raw):
+        if not isinstance(brk, dict):
+            raise ValueError(f"breaks[{i}] must be an object")
+        start_date = str(brk.get("start_date") or "").strip()
+        end_date = str(brk.get("end_date") or "").strip()
+        try:
+            first, last = parse_day(start_date), parse_day(end_date)
+        except ValueError as exc:
+            raise ValueError(f"breaks[{i}] needs ISO start_date and end_date (YYYY-MM-DD)") from exc
+        if last < first:
+            raise ValueError(f"breaks[{i}].end_date must be on or after start_date")
+        clean = {"start_date": start_date, "end_date": end_date}
+        name = str(brk.get("name") or "").strip()
+        if name:
+            clean = {"name": name, **clean}
+        breaks.append(clean)
+    return breaks
+
+
+def clean_semester(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The document `save_semester` would write for `doc`; raises ValueError if it is invalid."""
+    name = str(doc.get("name") or "").strip()
+    start_date = str(doc.get("start_date") or "").strip()
+    end_date = str(doc.get("end_date") or "").strip()
+    detail = str(doc.get("detail") or "").strip()
 
     if not start_date or not end_date or not name:
         raise ValueError("name, start_date, and end_date are required")
@@ -107,10 +166,14 @@ def save_semester(doc: Dict[str, Any]) -> Dict[str, Any]:
             datetime.fromisoformat(value)
         except ValueError as exc:  # pragma: no cover - simple validation
             raise ValueError(f"{label} must be ISO formatted (YYYY-MM-DD)") from exc
+    if end_date < start_date:
+        raise ValueError("end_date must be on or after start_date")
 
-    sid = (doc.get("id") or _slugify(name) or start_date).lower()
-    path = SEMESTERS_DIR / f"{sid}.yaml"
+    breaks = _clean_breaks(doc.get("breaks"))
 
+    sid = (str(doc.get("id") or "").strip() or _slugify(name) or start_date).lower()
+    if not _ID_PATTERN.match(sid):
+        raise ValueError("id may only contain lowercase letters, digits, '-' and '_'")
     payload = {
         "id": sid,
         "name": name,
@@ -119,24 +182,28 @@ def save_semester(doc: Dict[str, Any]) -> Dict[str, Any]:
     }
     if detail:
         payload["detail"] = detail
+    if breaks:
+        payload["breaks"] = breaks
+    return payload
 
-    _dump_file(path, payload)
-    _cache["mtime"] = 0
-    _ensure_fresh()
-    return get_semester(sid) or payload
+
+def save_semesters(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Save many semesters at once, all-or-nothing (see `DocumentStore.save`)."""
+    incoming: Dict[str, Dict[str, Any]] = {}
+    for idx, doc in enumerate(docs):
+        try:
+            payload = clean_semester(doc)
+        except ValueError as exc:
+            raise ValueError(f"semesters[{idx}]: {exc}") from exc
+        if payload["id"] in incoming:
+            raise ValueError(f"semesters[{idx}]: duplicate semester id '{payload['id']}'")
+        incoming[payload["id"]] = payload
+    return _store.save(list(incoming.values()))
+
+
+def save_semester(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return save_semesters([clean_semester(doc)])[0]
 
 
 def delete_semester(sid: str) -> bool:
-    sid = sid.strip().lower()
-    ok = False
-    for file in SEMESTERS_DIR.glob(f"{sid}.*"):
-        if file.suffix.lower() in {".yaml", ".yml", ".json"}:
-            try:
-                file.unlink()
-                ok = True
-            except OSError:
-                continue
-    if ok:
-        _cache["mtime"] = 0
-        _ensure_fresh()
-    return ok
+    return _store.delete(sid.strip().lower())
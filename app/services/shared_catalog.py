@@ -0,0 +1,105 @@
+"""Cross-process catalogue sharing for multi-worker deployments.
+
+Enabled with ``SHARED_CATALOG=1`` (POSIX only). The parsed catalogue of a
+data directory is published as a pickle file next to it
+(``data/.types.shared``), and a small memory-mapped counter file
+(``data/.types.shared.gen``) holds its generation. Every worker maps the
+counter once, so noticing a change made by another worker costs one 8-byte
+read; only then does it map the payload and unpickle it, instead of parsing
+the YAML/JSON files itself. The payload is written to a temp file and
+renamed into place, so readers never see a partial file.
+
+Rebuilds are serialized with an exclusive ``flock`` taken without blocking:
+the worker that gets it rescans the directory and publishes, and the others
+keep serving the catalogue they already have.
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock; shared mode stays off
+    fcntl = None
+
+_GEN = struct.Struct("<Q")
+_GEN_FILE_SIZE = mmap.PAGESIZE
+
+
+def enabled() -> bool:
+    return fcntl is not None and os.environ.get("SHARED_CATALOG", "0") == "1"
+
+
+class SharedCatalog:
+    """Generation-counted catalogue shared by every worker on the host."""
+
+    def __init__(self, directory: Path) -> None:
+        self.payload_path = directory.parent / f".{directory.name}.shared"
+        self.gen_path = directory.parent / f".{directory.name}.shared.gen"
+        self.lock_path = directory.parent / f".{directory.name}.shared.lock"
+        self._gen_map: Optional[mmap.mmap] = None
+
+    def _counter(self) -> mmap.mmap:
+        if self._gen_map is None:
+            fd = os.open(self.gen_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < _GEN_FILE_SIZE:
+                    os.ftruncate(fd, _GEN_FILE_SIZE)
+                self._gen_map = mmap.mmap(fd, _GEN_FILE_SIZE)
+            finally:
+                os.close(fd)
+        return self._gen_map
+
+    def generation(self) -> int:
+        """Generation of the published payload; 0 if nothing was published yet."""
+        return _GEN.unpack_from(self._counter(), 0)[0]
+
+    def load(self) -> Optional[Any]:
+        """The published payload, or None if there is none (or it is unreadable)."""
+        try:
+            with open(self.payload_path, "rb") as fh:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return pickle.loads(mm)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            return None
+
+    @contextmanager
+    def rebuild_lock(self, blocking: bool = False) -> Iterator[bool]:
+        """Yield True if this process won the right to rebuild, False if another one is at it."""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def publish(self, payload: Any) -> int:
+        """Atomically replace the payload and bump the generation; call under `rebuild_lock`."""
+        generation = self.generation() + 1
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=self.payload_path.name + ".", suffix=".tmp", dir=self.payload_path.parent
+        )
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, self.payload_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        _GEN.pack_into(self._counter(), 0, generation)
+        return generation
@@ -0,0 +1,77 @@
+"""Compiled snapshots of the file-backed stores for fast cold starts.
+
+A snapshot holds the parsed document of every file in a data directory,
+together with the file's mtime, size and content hash, pickled into a
+single file next to the directory (``data/.types.snapshot`` for
+``data/types``). A new worker loads it in one read instead of running every
+file through PyYAML; files whose mtime/size no longer match are hashed, and
+only those whose content actually changed are parsed again.
+
+Set ``STORE_SNAPSHOTS=0`` to disable reading and writing snapshots.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+# Bump when the entry layout changes so stale snapshots are ignored.
+FORMAT_VERSION = 1
+
+# file name -> (mtime_ns, size, sha1 hex digest, parsed document)
+Entry = Tuple[int, int, str, Any]
+
+
+def _enabled() -> bool:
+    return os.environ.get("STORE_SNAPSHOTS", "1") != "0"
+
+
+def snapshot_path(directory: Path) -> Path:
+    return directory.parent / f".{directory.name}.snapshot"
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def load_snapshot(directory: Path) -> Dict[str, Entry]:
+    """Entries from the snapshot for `directory`, or {} if missing, stale or unreadable."""
+    if not _enabled():
+        return {}
+    try:
+        with snapshot_path(directory).open("rb") as fh:
+            payload = pickle.load(fh)
+    except Exception:
+        return {}
+    if (
+        not isinstance(payload, dict)
+        or payload.get("format") != FORMAT_VERSION
+        or payload.get("directory") != str(directory.resolve())
+    ):
+        return {}
+    return payload.get("entries") or {}
+
+
+def write_snapshot(directory: Path, entries: Dict[str, Entry]) -> None:
+    """Atomically replace the snapshot for `directory`; failures are ignored."""
+    if not _enabled():
+        return
+    target = snapshot_path(directory)
+    payload = {"format": FORMAT_VERSION, "directory": str(directory.resolve()), "entries": entries}
+    tmp_name = None
+    try:
+        fd, tmp_name = tempfile.mkstemp(prefix=target.name + ".", suffix=".tmp", dir=target.parent)
+        with os.fdopen(fd, "wb") as fh:
+            pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, target)
+        tmp_name = None
+    except Exception:  # read-only deploys still work, they just start slower
+        pass
+    finally:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
@@ -0,0 +1,68 @@
+"""Compiled milestone templates for dynamic assignment types.
+
+Turning a type document into milestone offsets (copying the milestone list,
+parsing `effort_percent`, summing efforts, building cumulative ratios) is
+the same for every assignment of that type, so it is done once per type and
+reused until `type_store` reloads its cache. Entries are keyed by the
+catalogue's ETag as well as the type id, so a compile that races a reload
+can never be served for a catalogue other than the one it was built from.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.services import type_store
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    type_id: str
+    names: Tuple[str, ...]
+    ratios: Tuple[float, ...]  # cumulative effort share per milestone, clamped to [0, 1]
+    shares: Tuple[float, ...]  # effort share of each milestone on its own
+    version: str  # content hash of the type document (type_store.version_hash)
+
+
+# (type id, catalogue ETag) -> compiled template, None for unknown types and types without milestones
+_compiled: Dict[Tuple[str, str], Optional[CompiledTemplate]] = {}
+_compiled_etag = ""
+
+
+def compile_template(doc: Dict) -> CompiledTemplate:
+    raw_milestones = list(doc.get("milestones") or [])
+    effort_values = [max(0, int(m.get("effort_percent") or 0)) for m in raw_milestones]
+    total_effort = sum(effort_values)
+    names = []
+    ratios = []
+    cumulative = 0
+    for idx, m in enumerate(raw_milestones):
+        names.append(m.get("name") or "Milestone")
+        if total_effort > 0:
+            cumulative += effort_values[idx]
+            ratio = cumulative / total_effort
+        else:
+            ratio = (idx + 1) / max(len(raw_milestones), 1)
+        ratios.append(min(max(ratio, 0.0), 1.0))
+    shares = [r - p for r, p in zip(ratios, [0.0] + ratios[:-1])]
+    version = type_store.version_hash(doc)
+    return CompiledTemplate(doc.get("id") or "", tuple(names), tuple(ratios), tuple(shares), version)
+
+
+def get_template(tid: str) -> Optional[CompiledTemplate]:
+    """Compiled template for a type id, or None if the type has no milestones."""
+    global _compiled_etag
+    etag, _ = type_store.cache_validators()
+    if etag != _compiled_etag:
+        # Only frees memory: entries of older catalogues are never looked up again.
+        _compiled.clear()
+        _compiled_etag = etag
+    key = (tid, etag)
+    try:
+        return _compiled[key]
+    except KeyError:
+        pass
+    # Read after the ETag, so the document is never older than the catalogue in the key.
+    doc = type_store.get_type(tid)
+    tpl = compile_template(doc) if doc and doc.get("milestones") else None
+    _compiled[key] = tpl
+    return tpl
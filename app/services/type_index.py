@@ -0,0 +1,84 @@
+"""Search index over the assignment type catalogue.
+
+Built once per catalogue reload, as the type store's ``search`` index. Holds the
+`/types` summary rows, sorted by id, and a token index over each type's id,
+title and milestone names. A query matches a type when every query word is
+a prefix of one of its tokens. Lookups bisect a sorted token list, so their
+cost depends on the number of matches rather than the catalogue size.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class TypeIndex:
+    __slots__ = ("summaries", "_ids", "_tokens", "_postings")
+
+    def __init__(self, by_id: Mapping[str, Dict[str, Any]]) -> None:
+        rows = []
+        for tid in sorted(by_id):
+            t = by_id[tid]
+            rows.append({
+                "id": t["id"],
+                "title": t.get("title") or t["id"].title(),
+                "milestone_count": len(t.get("milestones") or []),
+            })
+        self.summaries: Tuple[Dict[str, Any], ...] = tuple(rows)
+        self._ids: List[str] = [row["id"] for row in rows]
+
+        postings: Dict[str, List[int]] = {}
+        for pos, tid in enumerate(self._ids):
+            t = by_id[tid]
+            words = tokenize(tid) + tokenize(str(t.get("title") or ""))
+            for m in t.get("milestones") or []:
+                if isinstance(m, dict):
+                    words += tokenize(str(m.get("name") or ""))
+            for word in set(words):
+                postings.setdefault(word, []).append(pos)
+        self._tokens: List[str] = sorted(postings)
+        self._postings: List[List[int]] = [postings[w] for w in self._tokens]
+
+    def _prefix_matches(self, prefix: str) -> set:
+        lo = bisect_left(self._tokens, prefix)
+        hi = bisect_right(self._tokens, prefix + "\uffff")
+        out: set = set()
+        for i in range(lo, hi):
+            out.update(self._postings[i])
+        return out
+
+    def _matching_positions(self, query: str) -> Sequence[int]:
+        words = tokenize(query)
+        if not words:
+            return range(len(self._ids))
+        # Narrowest word first keeps the intersections small.
+        sets = sorted((self._prefix_matches(w) for w in set(words)), key=len)
+        hits = sets[0]
+        for other in sets[1:]:
+            hits = hits & other
+            if not hits:
+                break
+        return sorted(hits)
+
+    def search(
+        self, query: str = "", limit: int = 50, after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """Page of summaries matching `query`, ordered by id, starting after id `after`.
+
+        Returns (rows, next cursor or None, total number of matches).
+        """
+        positions = self._matching_positions(query)
+        start = 0
+        if after:
+            # Positions follow id order, so the cursor is two bisects away.
+            start = bisect_left(positions, bisect_right(self._ids, after))
+        page = positions[start:start + limit]
+        rows = [self.summaries[p] for p in page]
+        more = start + limit < len(positions)
+        return rows, (rows[-1]["id"] if more and rows else None), len(positions)
@@ -1,14 +1,24 @@
+"""Assignment type catalogue: the documents under ``data/types``.
+
+Caching, change detection, indexes and writes are handled by
+`document_store.DocumentStore`; this module adds type-specific
+normalization, the search index, immutable archived versions and the
+``_metadata.json`` timestamp the frontend polls.
+"""
+
+import hashlib
 import json
 import os
 import re
 from datetime import datetime
+from functools import lru_cache
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
-try:
-    import yaml  # pip install pyyaml
-except ImportError:  # pragma: no cover - tests fallback to json path
-    yaml = None
+from app.services import document_store
+from app.services.document_store import Catalog, DocumentStore
+from app.services.type_index import TypeIndex
 
 _BASE_DIR = Path(__file__).resolve().parent.parent
 _DEFAULT_TYPES_DIR = _BASE_DIR / "data" / "types"
@@ -16,127 +26,220 @@ TYPES_DIR = Path(os.environ.get("ASSIGNMENT_TYPES_DIR", _DEFAULT_TYPES_DIR))
 METADATA_PATH = TYPES_DIR / "_metadata.json"
 DEFAULT_ICON = "DocumentTextIcon"
 
-_cache: Dict[str, Any] = {"by_id": {}, "mtime": 0.0}
+# Seconds between directory scans when no file watcher is running.
+POLL_INTERVAL = float(os.environ.get("TYPES_POLL_INTERVAL", "1.0"))
 
+# (stamp, payload) for _metadata.json, stamp being the file's (mtime_ns, size).
+_metadata: Tuple[Optional[Tuple[int, int]], Optional[Dict[str, Any]]] = (None, None)
 
-def _dir_mtime(path: Path) -> float:
-    mt = path.stat().st_mtime if path.exists() else 0.0
-    for f in path.glob("*"):
-        try:
-            mt = max(mt, f.stat().st_mtime)
-        except Exception:
-            pass
-    return mt
 
+def _slugify(raw: str) -> str:
+    return document_store.slugify(raw, "assignment")
 
-def _load_file(path: Path) -> Dict[str, Any]:
-    text = path.read_text(encoding="utf-8")
-    suffix = path.suffix.lower()
-    if suffix in {".yaml", ".yml"}:
-        if not yaml:
-            try:
-                return json.loads(text)
-            except json.JSONDecodeError as exc:  # pragma: no cover - defensive fallback
-                raise RuntimeError("PyYAML not installed — run `pip install pyyaml`") from exc
-        return yaml.safe_load(text) or {}
-    return json.loads(text)
 
+def _prepare(doc: Dict[str, Any], stem: str) -> Dict[str, Any]:
+    doc["id"] = _slugify(str(doc.get("id") or stem))
+    doc.setdefault("icon", DEFAULT_ICON)
+    return doc
 
-def _slugify(raw: str) -> str:
-    value = re.sub(r"[^a-z0-9]+", "-", raw.strip().lower())
-    value = re.sub(r"-+", "-", value).strip("-")
-    return value or "assignment"
 
+def _make_store(directory: Path) -> DocumentStore:
+    return DocumentStore(
+        directory,
+        name="types",
+        prepare=_prepare,
+        indexes={"search": TypeIndex},
+        write_suffix=".json",
+        slug_default="assignment",
+        poll_interval=POLL_INTERVAL,
+    )
+
+
+_store = _make_store(TYPES_DIR)
+
+
+def _ensure_fresh() -> Catalog:
+    return _store.catalog()
 
-def _refresh_cache() -> None:
-    by_id: Dict[str, Dict[str, Any]] = {}
-    if TYPES_DIR.exists():
-        for f in TYPES_DIR.glob("*.*"):
-            if f.name.startswith("_"):
-                continue
-            if f.suffix.lower() not in {".yaml", ".yml", ".json"}:
-                continue
-            doc = _load_file(f)
-            tid = _slugify(doc.get("id") or f.stem)
-            doc["id"] = tid
-            doc.setdefault("icon", DEFAULT_ICON)
-            by_id[tid] = doc
-    _cache["by_id"] = by_id
 
+def cache_version() -> int:
+    """Counter bumped on every reload; lets derived caches know when to drop entries."""
+    return _ensure_fresh().version
 
-def _ensure_fresh() -> None:
-    mt = _dir_mtime(TYPES_DIR)
-    if mt > _cache["mtime"]:
-        _refresh_cache()
-        _cache["mtime"] = mt
 
+def cache_validators(tid: Optional[str] = None) -> Optional[Tuple[str, float]]:
+    """(etag, last modified) for the whole catalogue, or for one type (None if unknown)."""
+    return _store.validators(tid)
 
-def list_types() -> Dict[str, Any]:
-    _ensure_fresh()
-    return _cache["by_id"]
+
+def list_types() -> Mapping[str, Dict[str, Any]]:
+    """Read-only mapping of type id -> document."""
+    return _ensure_fresh().by_id
+
+
+def search_index() -> TypeIndex:
+    """Summary rows and search index for the current catalogue."""
+    return _ensure_fresh().indexes["search"]
+
+
+def changes_since(since: float) -> Tuple[Optional[List[Dict[str, Any]]], List[str], float]:
+    """Types changed and ids deleted after `since`; see `DocumentStore.changes_since`."""
+    return _store.changes_since(since)
 
 
 def get_type(tid: str) -> Optional[Dict[str, Any]]:
-    _ensure_fresh()
-    return _cache["by_id"].get(_slugify(tid or ""))
+    return _store.get(tid)
 
 
-def save_type(doc: Dict[str, Any]) -> Dict[str, Any]:
-    TYPES_DIR.mkdir(parents=True, exist_ok=True)
-    incoming = dict(doc)
-    raw_id = incoming.get("id") or incoming.get("title") or "assignment"
-    tid = _slugify(str(raw_id))
-    incoming["id"] = tid
-    incoming.setdefault("icon", DEFAULT_ICON)
-    path = TYPES_DIR / f"{tid}.json"
-    yaml_path = TYPES_DIR / f"{tid}.yaml"
-    if yaml_path.exists():
+def version_hash(doc: Dict[str, Any]) -> str:
+    """Content address of a type document; also `CompiledTemplate.version`."""
+    return document_store.content_hash(doc)
+
+
+def _versions_dir() -> Path:
+    return _store.directory / "_versions"
+
+
+def _archive_version(doc: Dict[str, Any]) -> None:
+    """Keep an immutable copy of `doc` under its content hash (best effort).
+
+    Only the write paths archive: the version being replaced or deleted, and
+    the version written. Reloads never write here.
+    """
+    path = _versions_dir() / f"{version_hash(doc)}.json"
+    if path.exists():
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(document_store.stage_file(path, json.dumps(doc, indent=2, ensure_ascii=False)), path)
+    except OSError:  # read-only deploys still serve the current versions
+        pass
+
+
+@lru_cache(maxsize=256)
+def _load_version(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def get_type_version(tid: str, version: str) -> Optional[Dict[str, Any]]:
+    """A type exactly as it was when `version` was current; None if unknown."""
+    catalog = _ensure_fresh()
+    slug = _slugify(tid or "")
+    if catalog.versions.get(slug) == version:
+        return catalog.by_id[slug]
+    if not re.fullmatch(r"[0-9a-f]{40}", version or ""):
+        return None
+    doc = _load_version(_versions_dir() / f"{version}.json")
+    if doc is None or doc.get("id") != slug:
+        return None
+    return doc
+
+
+def compact_versions(keep: Iterable[str] = (), min_age: float = 0.0) -> List[str]:
+    """Delete archived versions that are not current, not in `keep` and older than `min_age` seconds.
+
+    Returns the removed version hashes.
+    """
+    catalog = _ensure_fresh()
+    protected = set(catalog.versions.values()) | set(keep)
+    cutoff = time.time() - min_age
+    removed = []
+    try:
+        entries = list(os.scandir(_versions_dir()))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        version, ext = os.path.splitext(entry.name)
+        if ext != ".json" or version in protected:
+            continue
         try:
-            yaml_path.unlink()
-        except Exception:
-            pass
-    path.write_text(json.dumps(incoming, indent=2, ensure_ascii=False), encoding="utf-8")
-    _cache["mtime"] = 0.0
-    _ensure_fresh()
+            if entry.stat().st_mtime > cutoff:
+                continue
+            os.unlink(entry.path)
+        except OSError:
+            continue
+        removed.append(version)
+    _load_version.cache_clear()
+    return sorted(removed)
+
+
+def save_types(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Save many types at once, all-or-nothing (see `DocumentStore.save`).
+
+    The metadata timestamp is bumped once for the whole batch.
+    """
+    incoming: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        item = dict(doc)
+        raw_id = item.get("id") or item.get("title") or "assignment"
+        tid = _slugify(str(raw_id))
+        if tid in incoming:
+            raise ValueError(f"duplicate type id '{tid}'")
+        item["id"] = tid
+        item.setdefault("icon", DEFAULT_ICON)
+        incoming[tid] = item
+
+    catalog = _ensure_fresh()
+    for tid in incoming:
+        if tid in catalog.by_id:
+            _archive_version(catalog.by_id[tid])
+    saved = _store.save(list(incoming.values()))
+    for doc in saved:
+        _archive_version(doc)
 
     # Update metadata timestamp so frontend knows data has changed
     record_generated_at()
+    return saved
 
-    return _cache["by_id"][tid]
+
+def save_type(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return save_types([doc])[0]
 
 
 def delete_type(tid: str) -> bool:
-    slug = _slugify(tid or "")
-    ok = False
-    if not TYPES_DIR.exists():
-        return False
-    for f in TYPES_DIR.glob(f"{slug}.*"):
-        if f.suffix.lower() in {".yaml", ".yml", ".json"}:
-            try:
-                f.unlink()
-                ok = True
-            except Exception:
-                pass
+    current = _store.get(tid or "")
+    if current is not None:
+        _archive_version(current)
+    ok = _store.delete(tid or "")
     if ok:
-        _cache["mtime"] = 0.0
-        _ensure_fresh()
-
         # Update metadata timestamp so frontend knows data has changed
         record_generated_at()
-
     return ok
 
 
 def get_metadata() -> Dict[str, Any]:
-    if not METADATA_PATH.exists():
+    try:
+        st = METADATA_PATH.stat()
+    except FileNotFoundError:
         # Auto-create metadata file with current timestamp on first access
         # This ensures frontend always has a valid timestamp to compare
         return record_generated_at()
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached_stamp, cached = _metadata
+    if cached_stamp == stamp:
+        return cached
     try:
-        return json.loads(METADATA_PATH.read_text(encoding="utf-8"))
+        payload = json.loads(METADATA_PATH.read_text(encoding="utf-8"))
     except json.JSONDecodeError:
         # Recreate if corrupt
         return record_generated_at()
+    _set_metadata(stamp, payload)
+    return payload
+
+
+def _set_metadata(stamp: Tuple[int, int], payload: Dict[str, Any]) -> None:
+    global _metadata
+    _metadata = (stamp, payload)
+
+
+def metadata_validators() -> Tuple[str, float]:
+    get_metadata()
+    stamp, payload = _metadata
+    etag = hashlib.sha1(str(payload.get("generated_at")).encode("utf-8")).hexdigest()
+    return etag, stamp[0] / 1e9
 
 
 def record_generated_at(timestamp: Optional[str] = None) -> Dict[str, Any]:
@@ -144,5 +247,6 @@ def record_generated_at(timestamp: Optional[str] = None) -> Dict[str, Any]:
     ts = timestamp or datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
     payload = {"generated_at": ts}
     METADATA_PATH.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-    _cache["mtime"] = 0.0
+    st = METADATA_PATH.stat()
+    _set_metadata((st.st_mtime_ns, st.st_size), payload)
     return payload
@@ -0,0 +1,172 @@
+"""YAML loading for the file-backed stores.
+
+Uses libyaml's ``CSafeLoader`` when PyYAML was built with it, falling back
+to the pure-Python ``SafeLoader``; both produce the same documents. Parsed
+documents are also cached as JSON under ``YAML_CACHE_DIR`` (default
+``data/.yaml-cache``), keyed by the SHA-1 of the file (or of the YAML
+text), so a document that was parsed once, by any process, is never parsed
+again until its content changes. Dates survive the round trip; documents
+holding anything JSON cannot represent, including mapping keys that are not
+strings (which JSON would turn into strings), are simply not cached.
+
+Entries are touched whenever they are read. After each catalogue reload the
+store calls `prune`, which deletes the least recently used entries beyond
+``YAML_CACHE_MAX_ENTRIES`` (default 1024), so entries for superseded file
+contents do not pile up. Entries of the files in the current catalogue are
+never deleted, however many there are.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import yaml  # pip install pyyaml
+except ImportError:  # pragma: no cover - optional dependency
+    yaml = None
+
+if yaml is None:  # pragma: no cover
+    SafeLoader = None
+    LOADER = "unavailable"
+else:
+    try:
+        from yaml import CSafeLoader as SafeLoader
+
+        LOADER = "libyaml"
+    except ImportError:  # pragma: no cover - PyYAML built without libyaml
+        from yaml import SafeLoader
+
+        LOADER = "pure-python"
+
+_BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(os.environ.get("YAML_CACHE_DIR", _BASE_DIR / "data" / ".yaml-cache"))
+CACHE_MAX_ENTRIES = int(os.environ.get("YAML_CACHE_MAX_ENTRIES", "1024"))
+# Bump when the cached representation changes.
+_CACHE_FORMAT = "1"
+
+_stats: Dict[str, int] = {"parsed": 0, "cache_hits": 0}
+
+
+def available() -> bool:
+    return yaml is not None
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _cache_path(text: str, file_digest: Optional[str] = None) -> Path:
+    source = f"file:{file_digest}" if file_digest else text
+    digest = hashlib.sha1(f"{_CACHE_FORMAT}:{source}".encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{digest}.json"
+
+
+def _string_keys(value: Any) -> bool:
+    """Whether every mapping in `value` has only string keys, so JSON keeps it as is."""
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _string_keys(v) for k, v in value.items())
+    if isinstance(value, list):
+        return all(_string_keys(v) for v in value)
+    return True
+
+
+def prune(keep: Iterable[str] = ()) -> int:
+    """Delete least recently used entries beyond `CACHE_MAX_ENTRIES`; returns how many.
+
+    `keep` holds the file digests (see `load_yaml`) of the documents still in
+    use; their entries are never deleted. Call once per reload, not per file.
+    """
+    protected = {_cache_path("", digest).name for digest in keep}
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".json")]
+    except OSError:
+        return 0
+    excess = len(entries) - max(CACHE_MAX_ENTRIES, len(protected))
+    if excess <= 0:
+        return 0
+    stamped = []
+    for entry in entries:
+        if entry.name in protected:
+            continue
+        try:
+            stamped.append((entry.stat().st_mtime_ns, entry.path))
+        except OSError:
+            continue
+    removed = 0
+    for _, path in sorted(stamped)[:excess]:
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _store(path: Path, doc: Any) -> None:
+    if not _string_keys(doc):
+        return
+    try:
+        data = json.dumps(doc, default=_encode, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return
+    tmp_name = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=CACHE_DIR)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(data)
+        os.replace(tmp_name, path)
+        tmp_name = None
+    except OSError:  # read-only deploys just skip the cache
+        pass
+    finally:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
+def load_yaml(text: str, file_digest: Optional[str] = None) -> Any:
+    """`yaml.safe_load(text)`, served from the parsed-JSON cache when possible.
+
+    `file_digest`, the SHA-1 of the file `text` was read from, keys the entry
+    instead of the text itself, so `prune` can tell which entries are in use.
+    """
+    path = _cache_path(text, file_digest)
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"), object_hook=_decode)
+    except (OSError, ValueError):
+        pass
+    else:
+        _stats["cache_hits"] += 1
+        try:
+            os.utime(path)  # most recently used, for `prune`
+        except OSError:
+            pass
+        return doc
+    doc = yaml.load(text, Loader=SafeLoader)
+    _stats["parsed"] += 1
+    _store(path, doc)
+    return doc
+
+
+def stats() -> Dict[str, Any]:
+    return {"loader": LOADER, **_stats}
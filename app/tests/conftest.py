@@ -5,6 +5,7 @@ from pathlib import Path
 import pytest
 
 from app import create_app
+from app.services import semester_store, type_store, yaml_loader
 
 
 @pytest.fixture(autouse=True)
@@ -17,6 +18,17 @@ def assignment_types_dir(tmp_path, monkeypatch):
             if item.is_file():
                 shutil.copy(item, dest / item.name)
     monkeypatch.setenv("ASSIGNMENT_TYPES_DIR", str(dest))
+    # The stores bind their directories at import time, so the env var alone
+    # is too late: point them (and their snapshots and caches) at tmp_path.
+    monkeypatch.setattr(type_store, "TYPES_DIR", dest)
+    monkeypatch.setattr(type_store, "METADATA_PATH", dest / "_metadata.json")
+    monkeypatch.setattr(type_store, "_store", type_store._make_store(dest))
+    semesters = tmp_path / "data" / "semesters"
+    if semester_store._DEFAULT_SEMESTERS_DIR.exists():
+        shutil.copytree(semester_store._DEFAULT_SEMESTERS_DIR, semesters)
+    monkeypatch.setattr(semester_store, "SEMESTERS_DIR", semesters)
+    monkeypatch.setattr(semester_store, "_store", semester_store._make_store(semesters))
+    monkeypatch.setattr(yaml_loader, "CACHE_DIR", tmp_path / ".yaml-cache")
     yield dest
 
 
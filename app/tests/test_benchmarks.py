@@ -0,0 +1,159 @@
+"""Milestone generator benchmarks.
+
+Skipped unless ``RUN_BENCHMARKS=1``. Each case appends one JSON object to
+``BENCHMARK_OUTPUT`` (default ``benchmark-results.jsonl``). Point
+``BENCHMARK_BASELINE`` at a previous results file to fail any case that is
+more than ``BENCHMARK_TOLERANCE`` (default 0.5, i.e. 50%) slower.
+
+The generator and route cases run with the result cache turned off so every
+repeat really schedules; `test_generator_cache_hit` measures the cache.
+
+    RUN_BENCHMARKS=1 python -m pytest -q app/tests/test_benchmarks.py
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.services import generator
+from app.services.generator import clear_generation_cache, generate_milestones_for_plan, generation_cache_stats
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run benchmarks"
+)
+
+SIZES = [10, 1_000, 100_000]
+# Days between the plan start and the latest due date.
+WINDOWS = {"dense": 21, "sparse": 365}
+# Dynamic types come from data/types; the others only exist in MILESTONES_BY_TYPE.
+TYPE_SETS = {
+    "dynamic": ["essay", "lab_report", "presentation", "group_project", "reflective_writing"],
+    "fallback": ["report", "quiz", "exam_prep", "lab", "other"],
+}
+START = date(2025, 2, 24)
+
+
+def _assignments(size: int, window: int, types: list[str]) -> list[dict]:
+    rng = random.Random(size * 31 + window)
+    out = []
+    for i in range(size):
+        due = START + timedelta(days=rng.randint(2, window))
+        out.append({
+            "id": f"a{i}",
+            "unit": f"CITS{3000 + i % 500}",
+            "title": f"Assignment {i}",
+            "type": types[i % len(types)],
+            "estimated_hours": rng.randint(2, 40),
+            "due_date": due.isoformat(),
+        })
+    return out
+
+
+def _repeats(size: int) -> int:
+    return max(1, min(5, 10_000 // size))
+
+
+@pytest.fixture()
+def no_result_cache(monkeypatch):
+    """Turn the generation result cache off, so repeats of identical input are not cache hits."""
+    monkeypatch.setattr(generator, "RESULT_CACHE_SIZE", 0)
+    clear_generation_cache()
+
+
+def _baseline() -> dict[str, float]:
+    path = os.environ.get("BENCHMARK_BASELINE")
+    if not path or not Path(path).exists():
+        return {}
+    out = {}
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            row = json.loads(line)
+            out[row["name"]] = row["seconds"]
+    return out
+
+
+@pytest.fixture(scope="session")
+def record():
+    rows: list[dict] = []
+    baseline = _baseline()
+    tolerance = float(os.environ.get("BENCHMARK_TOLERANCE", "0.5"))
+
+    def _record(name: str, size: int, seconds: float, **extra) -> None:
+        rows.append({
+            "name": name,
+            "size": size,
+            "seconds": round(seconds, 6),
+            "assignments_per_sec": round(size / seconds, 1) if seconds else None,
+            "python": platform.python_version(),
+            **extra,
+        })
+        previous = baseline.get(name)
+        if previous is not None:
+            assert seconds <= previous * (1 + tolerance), (
+                f"{name}: {seconds:.4f}s vs baseline {previous:.4f}s"
+            )
+
+    yield _record
+
+    out = Path(os.environ.get("BENCHMARK_OUTPUT", "benchmark-results.jsonl"))
+    with out.open("a", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+
+
+@pytest.mark.parametrize("type_set", sorted(TYPE_SETS))
+@pytest.mark.parametrize("density", sorted(WINDOWS))
+@pytest.mark.parametrize("size", SIZES)
+def test_generator(record, no_result_cache, size, density, type_set):
+    assignments = _assignments(size, WINDOWS[density], TYPE_SETS[type_set])
+    best = float("inf")
+    for _ in range(_repeats(size)):
+        plan = {"start_date": START.isoformat(), "assignments": [dict(a) for a in assignments]}
+        t0 = time.perf_counter()
+        generate_milestones_for_plan(plan)
+        best = min(best, time.perf_counter() - t0)
+        assert all(a["milestones"] for a in plan["assignments"])
+    record(f"generator/{size}/{density}/{type_set}", size, best,
+           path="generator", density=density, types=type_set)
+
+
+@pytest.mark.parametrize("density", sorted(WINDOWS))
+@pytest.mark.parametrize("size", SIZES)
+def test_plan_route(record, no_result_cache, client, size, density):
+    assignments = _assignments(size, WINDOWS[density], TYPE_SETS["dynamic"])
+    best = float("inf")
+    for _ in range(_repeats(size)):
+        t0 = time.perf_counter()
+        created = client.post("/plan", json={
+            "title": "Benchmark", "start_date": START.isoformat(), "assignments": assignments,
+        })
+        assert created.status_code == 201
+        pid = created.get_json()["plan_id"]
+        generated = client.post(f"/plan/{pid}/generate")
+        assert generated.status_code == 200
+        best = min(best, time.perf_counter() - t0)
+    record(f"route/{size}/{density}", size, best, path="route", density=density, types="dynamic")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_generator_cache_hit(record, size):
+    assignments = _assignments(size, WINDOWS["sparse"], TYPE_SETS["dynamic"])
+    clear_generation_cache()
+    generate_milestones_for_plan({"start_date": START.isoformat(), "assignments": [dict(a) for a in assignments]})
+    best = float("inf")
+    for _ in range(_repeats(size)):
+        plan = {"start_date": START.isoformat(), "assignments": [dict(a) for a in assignments]}
+        t0 = time.perf_counter()
+        generate_milestones_for_plan(plan)
+        best = min(best, time.perf_counter() - t0)
+        assert all(a["milestones"] for a in plan["assignments"])
+    assert generation_cache_stats()["hits"] == _repeats(size)
+    record(f"generator-cache-hit/{size}", size, best, path="generator-cache-hit", density="sparse", types="dynamic")
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import copy
+import json
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.generator import (
+    clear_generation_cache,
+    generate_milestones_for_plan,
+    generate_milestones_for_plans,
+    generation_cache_stats,
+    mark_assignment_dirty,
+    regenerate_milestones_for_plan,
+    remove_assignment,
+)
+from app.services.dates import iso_day, parse_day
+from app.services import semester_store
+from app.services.occupancy import BlockedDays, DayOccupancy
+from app.services.templates import compile_template, get_template
+
+TYPES = ["essay", "lab_report", "presentation", "report", "quiz", "mystery"]
+
+
+def _random_plan(rng: random.Random, n: int) -> dict:
+    start = date(2025, 2, 24)
+    assignments = []
+    for i in range(n):
+        due = start + timedelta(days=rng.randint(-3, 60))
+        assignments.append({
+            "id": f"a{i}",
+            "unit": "CITS3200",
+            "title": f"Task {i}",
+            "type": rng.choice(TYPES),
+            "start_date": start.isoformat(),
+            "due_date": due.isoformat(),
+        })
+    return {"plan_id": "p", "title": "T", "start_date": start.isoformat(), "assignments": assignments}
+
+
+def test_batch_matches_single_plan_generation():
+    rng = random.Random(3200)
+    plans = [_random_plan(rng, rng.randint(0, 12)) for _ in range(40)]
+    expected = [generate_milestones_for_plan(copy.deepcopy(p)) for p in plans]
+
+    errors = generate_milestones_for_plans(plans)
+
+    assert errors == {}
+    assert plans == expected
+
+
+def test_batch_reports_invalid_plans():
+    good = _random_plan(random.Random(1), 3)
+    bad = {"plan_id": "bad", "assignments": [{"title": "No due date"}]}
+
+    errors = generate_milestones_for_plans([good, bad])
+
+    assert list(errors) == [1]
+    assert "due date" in errors[1]
+    assert all(a.get("milestones") for a in good["assignments"])
+    assert "milestones" not in bad["assignments"][0]
+
+
+def test_generate_batch_route(client):
+    ids = []
+    for due in ("2025-03-20", "2025-04-10"):
+        r = client.post("/plan", json={
+            "title": "Plan",
+            "start_date": "2025-02-24",
+            "assignments": [{"unit": "CITS3200", "title": "Essay", "type": "essay", "due_date": due}],
+        })
+        ids.append(r.get_json()["plan_id"])
+
+    r = client.post("/plan/generate-batch", json={"plan_ids": ids})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["generated"] == 2
+    assert body["errors"] == []
+    assert [p["plan_id"] for p in body["plans"]] == ids
+    assert all(p["assignments"][0]["milestones"] for p in body["plans"])
+
+    r = client.post("/plan/generate-batch", json={"plan_ids": ["nope"]})
+    assert r.status_code == 404
+
+
+def test_nearest_free_day_is_found_beyond_a_week():
+    base = date(2025, 3, 1).toordinal()
+    used = DayOccupancy(range(base - 10, base + 11))
+    assert used.nearest_free(base, base - 30, base + 30) == base + 11
+    assert used.nearest_free(base, base - 30, base + 10) == base - 11
+    assert used.nearest_free(base, base - 10, base + 10) is None
+
+    used.release(base + 3)
+    assert used.nearest_free(base, base - 30, base + 30) == base + 3
+    assert used.nearest_free(base - 5, base - 30, base + 30) == base - 11
+    assert used.nearest_free(base - 4, base - 30, base + 30) == base + 3
+
+
+def test_crowded_window_spreads_milestones_instead_of_stacking():
+    assignments = [{
+        "id": f"a{i}", "unit": "CITS3200", "title": f"Quiz {i}", "type": "quiz",
+        "start_date": "2025-03-01", "due_date": "2025-04-30",
+    } for i in range(19)]
+    plan = generate_milestones_for_plan({"start_date": "2025-03-01", "assignments": assignments})
+
+    dates = [m["date"] for a in plan["assignments"] for m in a["milestones"]]
+    assert len(dates) == 57
+    assert len(set(dates)) == len(dates)
+    assert min(dates) >= "2025-03-02" and max(dates) <= "2025-04-29"
+
+
+def test_compiled_template_ratios_and_caching():
+    tpl = compile_template({"id": "x", "milestones": [
+        {"name": "A", "effort_percent": 25},
+        {"name": "B"},
+        {"name": "C", "effort_percent": 75},
+    ]})
+    assert tpl.names == ("A", "B", "C")
+    assert tpl.ratios == (0.25, 0.25, 1.0)
+
+    assert get_template("essay") is get_template("essay")
+    assert get_template("definitely-not-a-type") is None
+
+
+def test_template_compiled_across_a_reload_is_not_served_afterwards(monkeypatch):
+    from app.services import templates, type_store
+
+    monkeypatch.setattr(templates, "_compiled", {})
+    old_doc = type_store.get_type("essay")
+    real_get_type = type_store.get_type
+
+    def reload_mid_compile(tid):
+        # Another thread saves the type and compiles it while this compile is
+        # still working from the previous catalogue.
+        monkeypatch.setattr(type_store, "get_type", real_get_type)
+        type_store.save_type({**old_doc, "milestones": [{"name": "Only", "effort_percent": 100}]})
+        assert get_template("essay").names == ("Only",)
+        return old_doc
+
+    monkeypatch.setattr(type_store, "get_type", reload_mid_compile)
+    assert len(get_template("essay").names) == len(old_doc["milestones"])
+    assert get_template("essay").names == ("Only",)
+
+
+def test_incremental_regeneration_matches_full_run():
+    rng = random.Random(42)
+    plan = _random_plan(rng, 30)
+    generate_milestones_for_plan(plan)
+
+    plan["assignments"][4]["due_date"] = "2025-03-05"
+    plan["assignments"][4]["dueDate"] = "2025-03-05"
+    mark_assignment_dirty(plan, "a4")
+    assert remove_assignment(plan, "a9")
+    expected = generate_milestones_for_plan(copy.deepcopy(plan))
+
+    recomputed = regenerate_milestones_for_plan(plan)
+
+    assert plan["assignments"] == expected["assignments"]
+    assert 1 <= recomputed < len(plan["assignments"])
+    assert plan["dirty_assignments"] == []
+    assert regenerate_milestones_for_plan(plan) == 0
+
+
+def test_assignment_edit_marks_dirty_and_regenerates(client):
+    r = client.post("/plan", json={
+        "title": "Plan",
+        "start_date": "2025-02-24",
+        "assignments": [
+            {"id": "a1", "unit": "CITS3200", "title": "Essay", "type": "essay", "due_date": "2025-04-01"},
+            {"id": "a2", "unit": "CITS3200", "title": "Quiz", "type": "quiz", "due_date": "2025-03-10"},
+        ],
+    })
+    pid = r.get_json()["plan_id"]
+    assert client.post(f"/plan/{pid}/generate").status_code == 200
+
+    r = client.patch(f"/plan/{pid}/assignments/a2", json={"due_date": "2025-03-20"})
+    assert r.status_code == 200
+    assert client.patch(f"/plan/{pid}/assignments/a1", json={"title": "Essay v2"}).status_code == 200
+
+    plan = client.post(f"/plan/{pid}/generate").get_json()
+    assert plan["dirty_assignments"] == []
+    assert plan["assignments"][1]["due_date"] == "2025-03-20"
+    assert max(m["date"] for m in plan["assignments"][1]["milestones"]) < "2025-03-20"
+
+    assert client.delete(f"/plan/{pid}/assignments/a2").status_code == 204
+    assert client.delete(f"/plan/{pid}/assignments/a2").status_code == 404
+
+
+def test_capacity_scheduler_respects_daily_budget():
+    plan = {
+        "start_date": "2025-03-01",
+        "scheduler": "capacity",
+        "hours_per_day": 2,
+        "assignments": [
+            {"id": "a1", "title": "Essay", "type": "quiz", "due_date": "2025-03-31", "estimated_hours": 30},
+            {"id": "a2", "title": "Lab", "type": "quiz", "due_date": "2025-03-12", "estimated_hours": 12},
+            {"id": "a3", "title": "Huge", "type": "quiz", "due_date": "2025-03-05", "estimated_hours": 100},
+        ],
+    }
+    generate_milestones_for_plan(plan)
+
+    for a in plan["assignments"]:
+        dates = [m["date"] for m in a["milestones"]]
+        assert dates == sorted(dates)
+        assert "2025-03-01" < dates[0] and dates[-1] < a["due_date"]
+        assert abs(sum(m["hours"] for m in a["milestones"]) - a["estimated_hours"]) < 0.05
+    # 2h/day from 1 March cannot fit 100 hours before 5 March
+    assert [w["assignment"] for w in plan["warnings"]] == ["Huge"]
+    # the lab only gets hours once the overloaded assignment is due, then needs 6 days
+    assert [m["date"] for m in plan["assignments"][1]["milestones"]] == ["2025-03-06", "2025-03-08", "2025-03-10"]
+    # the essay waits for the lab and then takes 15 days of work
+    assert plan["assignments"][0]["milestones"][-1]["date"] == "2025-03-25"
+
+
+def test_blocked_days_are_never_free():
+    base = date(2025, 4, 14).toordinal()
+    blocked = BlockedDays([(base, base + 6)])
+    assert blocked.is_blocked(base) and blocked.is_blocked(base + 6)
+    assert not blocked.is_blocked(base - 1) and not blocked.is_blocked(base + 7)
+
+    used = DayOccupancy([base + 7], blocked=blocked)
+    assert not used.is_free(base + 3)
+    assert used.nearest_free(base + 3, base - 30, base + 30) == base - 1
+    assert used.nearest_free(base + 5, base - 30, base + 30) == base + 8
+    assert used.nearest_free(base + 3, base, base + 6) is None
+    # A full window falls back to the nearest day outside the break.
+    assert used.nearest_unblocked(base + 2, base - 2, base + 6) == base - 1
+    assert used.nearest_unblocked(base + 5, base, base + 7) == base + 7
+    assert used.nearest_unblocked(base + 3, base, base + 6) is None
+    # Rebasing below the first day seen keeps the blocked days aligned.
+    used.occupy(base - 1000)
+    assert used.nearest_free(base + 3, base - 30, base + 30) == base - 1
+    assert not used.any_between(base, base + 6)
+
+
+def test_generation_skips_semester_breaks(tmp_path, monkeypatch):
+    semesters = tmp_path / "semesters"
+    semesters.mkdir()
+    monkeypatch.setattr(semester_store, "SEMESTERS_DIR", semesters)
+    monkeypatch.setattr(semester_store, "_store", semester_store._make_store(semesters))
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    monkeypatch.setenv("SEMESTERS_WATCH", "0")
+    semester_store.save_semester({
+        "id": "s1", "name": "Semester 1", "start_date": "2025-02-24", "end_date": "2025-05-23",
+        "breaks": [{"name": "Study break", "start_date": "2025-04-14", "end_date": "2025-04-20"}],
+    })
+    clear_generation_cache()
+
+    rng = random.Random(5)
+    spread = _random_plan(rng, 25)
+    capacity = {**_random_plan(rng, 10), "scheduler": "capacity"}
+    for a in capacity["assignments"]:
+        a["estimated_hours"] = 12
+    for plan in (spread, capacity):
+        generate_milestones_for_plan(plan)
+        dates = [m["date"] for a in plan["assignments"] for m in a["milestones"]]
+        assert not [d for d in dates if "2025-04-14" <= d <= "2025-04-20"]
+
+    batch = _random_plan(random.Random(5), 25)
+    assert generate_milestones_for_plans([batch]) == {}
+    assert batch["assignments"] == spread["assignments"]
+
+    # A crowded window stacks outside the break rather than inside it.
+    tight = {"start_date": "2025-04-11", "assignments": [
+        {"id": "q", "title": "Quiz", "type": "quiz", "due_date": "2025-04-16"},
+    ]}
+    generate_milestones_for_plan(tight)
+    assert {m["date"] for m in tight["assignments"][0]["milestones"]} <= {"2025-04-12", "2025-04-13"}
+
+
+def test_removing_a_break_regenerates_the_plan(tmp_path, monkeypatch):
+    semesters = tmp_path / "semesters"
+    semesters.mkdir()
+    monkeypatch.setattr(semester_store, "SEMESTERS_DIR", semesters)
+    monkeypatch.setattr(semester_store, "_store", semester_store._make_store(semesters))
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    monkeypatch.setenv("SEMESTERS_WATCH", "0")
+    semester = {"id": "s1", "name": "Semester 1", "start_date": "2025-02-24", "end_date": "2025-05-23"}
+    semester_store.save_semester({
+        **semester, "breaks": [{"name": "Study break", "start_date": "2025-04-14", "end_date": "2025-04-20"}],
+    })
+    clear_generation_cache()
+    plan = _random_plan(random.Random(5), 25)
+    generate_milestones_for_plan(plan)
+    assert regenerate_milestones_for_plan(plan) == 0
+
+    semester_store.save_semester(semester)
+    before = copy.deepcopy(plan["assignments"])
+    expected = generate_milestones_for_plan(_random_plan(random.Random(5), 25))
+    assert regenerate_milestones_for_plan(plan) == len(plan["assignments"])
+    assert plan["assignments"] == expected["assignments"] != before
+    assert regenerate_milestones_for_plan(plan) == 0
+
+
+def test_generation_results_are_memoized():
+    clear_generation_cache()
+    first = _random_plan(random.Random(11), 30)
+    second = copy.deepcopy(first)
+    second["plan_id"] = "other"
+    generate_milestones_for_plan(first)
+    generate_milestones_for_plan(second)
+    stats = generation_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert second["assignments"] == first["assignments"]
+
+    # Cached results are copies, and changed inputs miss.
+    second["assignments"][0]["milestones"].clear()
+    third = copy.deepcopy(first)
+    generate_milestones_for_plan(third)
+    assert third["assignments"] == first["assignments"]
+    third["assignments"][0]["title"] = "Renamed"
+    third["assignments"][0].pop("milestones")
+    generate_milestones_for_plan(third)
+    assert generation_cache_stats()["misses"] == 2
+
+
+def test_assignments_record_type_version_and_regenerate_when_it_changes(assignment_types_dir, monkeypatch):
+    from app.services import type_store
+
+    monkeypatch.setattr(type_store, "TYPES_DIR", assignment_types_dir)
+    monkeypatch.setattr(type_store, "_store", type_store._make_store(assignment_types_dir))
+    monkeypatch.setenv("TYPES_WATCH", "0")
+    clear_generation_cache()
+
+    plan = _random_plan(random.Random(7), 8)
+    for a in plan["assignments"]:
+        a["type"] = "essay"
+    plan["assignments"][-1]["type"] = "mystery"
+    generate_milestones_for_plan(plan)
+    version = plan["assignments"][0]["type_version"]
+    assert type_store.get_type_version("essay", version) == type_store.get_type("essay")
+    assert "type_version" not in plan["assignments"][-1]
+    assert regenerate_milestones_for_plan(plan) == 0
+
+    essay = dict(type_store.get_type("essay"))
+    essay["milestones"] = essay["milestones"][:1]
+    type_store.save_type(essay)
+    expected = generate_milestones_for_plan(copy.deepcopy(plan))
+    assert regenerate_milestones_for_plan(plan) >= 7
+    assert plan["assignments"] == expected["assignments"]
+    assert {a.get("type_version") for a in plan["assignments"][:-1]} == {type_store.version_hash(essay)}
+    assert all(len(a["milestones"]) == 1 for a in plan["assignments"][:-1])
+    # The plan still resolves the version it was first scheduled against.
+    assert type_store.get_type_version("essay", version)["milestones"] != essay["milestones"]
+
+
+def test_day_ordinal_parsing():
+    assert parse_day("2025-03-01") == date(2025, 3, 1).toordinal()
+    assert parse_day("2025-03-01T09:30:00") == date(2025, 3, 1).toordinal()
+    assert iso_day(parse_day(" 2025-12-31 ")) == "2025-12-31"
+    for bad in ("", "2025-13-01", "not a date"):
+        with pytest.raises(ValueError):
+            parse_day(bad)
+
+
+def test_generate_streams_ndjson(client):
+    r = client.post("/plan", json={
+        "title": "Plan",
+        "start_date": "2025-02-24",
+        "assignments": [
+            {"unit": "CITS3200", "title": "Essay", "type": "essay", "due_date": "2025-04-01"},
+            {"unit": "CITS3200", "title": "Quiz", "type": "quiz", "due_date": "2025-03-10"},
+        ],
+    })
+    pid = r.get_json()["plan_id"]
+
+    r = client.post(f"/plan/{pid}/generate", headers={"Accept": "application/x-ndjson"})
+    assert r.status_code == 200
+    assert r.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+    assert [line["type"] for line in lines] == ["plan", "assignment", "assignment", "done"]
+    assert lines[0]["plan_id"] == pid and "assignments" not in lines[0]
+    assert [line["assignment"]["title"] for line in lines[1:3]] == ["Essay", "Quiz"]
+    assert all(line["recomputed"] and line["assignment"]["milestones"] for line in lines[1:3])
+
+    # plain JSON callers still get the whole plan
+    assert client.post(f"/plan/{pid}/generate").get_json()["assignments"][0]["milestones"]
@@ -1,3 +1,12 @@
+import threading
+
+import pytest
+
+from app import create_app
+from app.routes import plan as plan_routes
+from app.services.plan_store import MemoryPlanStore, PlanStore, SQLitePlanStore
+
+
 def test_assignment_crud(client):
     r = client.post("/plan", json={"assignments":[{"id":"a1","unit":"CITS3200","title":"R","due_date":"2025-10-20"}]})
     pid = r.get_json()["plan_id"]
@@ -8,3 +17,158 @@ def test_assignment_crud(client):
     # delete
     r = client.delete(f"/plan/{pid}/assignments/a1")
     assert r.status_code == 204
+
+
+def test_patch_accepts_either_due_date_spelling(client):
+    r = client.post("/plan", json={
+        "title": "Plan",
+        "start_date": "2025-02-24",
+        "assignments": [{"id": "a1", "unit": "CITS3200", "title": "R", "due_date": "2025-03-20"}],
+    })
+    pid = r.get_json()["plan_id"]
+
+    r = client.patch(f"/plan/{pid}/assignments/a1", json={"dueDate": "2025-04-01"})
+    assert r.status_code == 200
+    assert r.get_json()["due_date"] == r.get_json()["dueDate"] == "2025-04-01"
+    assert client.application.config["PLAN_STORE"].get(pid)["dirty_assignments"] == ["a1"]
+
+    r = client.patch(f"/plan/{pid}/assignments/a1", json={"due_date": "2025-04-08"})
+    assert r.get_json()["dueDate"] == "2025-04-08"
+
+
+def test_sqlite_plan_store_is_shared_between_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLAN_DB", str(tmp_path / "plans.sqlite3"))
+    first, second = create_app().test_client(), create_app().test_client()
+
+    r = first.post("/plan", json={
+        "title": "Plan",
+        "start_date": "2025-02-24",
+        "assignments": [{"id": "a1", "unit": "CITS3200", "title": "Essay", "type": "essay", "due_date": "2025-03-20"}],
+    })
+    pid = r.get_json()["plan_id"]
+
+    # Created on one worker, edited and generated on another, visible to both.
+    assert second.patch(f"/plan/{pid}/assignments/a1", json={"title": "Long essay"}).status_code == 200
+    assert second.post(f"/plan/{pid}/generate").get_json()["assignments"][0]["milestones"]
+    body = first.post("/plan/generate-batch", json={"plan_ids": [pid, pid]}).get_json()
+    assert (body["generated"], body["errors"]) == (1, [])
+    assert body["plans"][0]["assignments"][0]["title"] == "Long essay"
+    assert second.delete(f"/plan/{pid}/assignments/nope").status_code == 404
+    assert first.post("/plan/nope/generate").status_code == 404
+
+
+def test_sqlite_plan_store_serializes_edits_and_rolls_back_failures(tmp_path):
+    path = tmp_path / "plans.sqlite3"
+    SQLitePlanStore(path).put({"plan_id": "p", "assignments": []})
+
+    def add(i: int) -> None:
+        store = SQLitePlanStore(path)  # one store per "worker"
+        with store.editing("p") as plan:
+            plan["assignments"].append({"id": f"a{i}"})
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    store = SQLitePlanStore(path)
+    assert sorted(a["id"] for a in store.get("p")["assignments"]) == [f"a{i}" for i in range(8)]
+
+    with pytest.raises(RuntimeError):
+        with store.editing("p") as plan:
+            plan["assignments"].clear()
+            raise RuntimeError("boom")
+    assert len(store.get("p")["assignments"]) == 8
+    assert store.ids() == ["p"]
+    assert store.get_many(["p", "missing"]).keys() == {"p"}
+    assert store.delete("p") and not store.delete("p")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_put_if_unchanged_refuses_stale_revisions(tmp_path, backend):
+    store = MemoryPlanStore() if backend == "memory" else SQLitePlanStore(tmp_path / "plans.sqlite3")
+    store.put({"plan_id": "p", "assignments": []})
+
+    plan, revision = store.snapshot("p")
+    plan["assignments"].append({"id": "generated"})
+    assert store.get("p")["assignments"] == []  # the snapshot is a private copy
+    with store.editing("p") as current:
+        current["title"] = "edited meanwhile"
+    assert not store.put_if_unchanged(plan, revision)
+    assert store.get("p") == {"plan_id": "p", "assignments": [], "title": "edited meanwhile"}
+
+    plan, revision = store.snapshot("p")
+    assert store.put_if_unchanged({**plan, "assignments": [{"id": "generated"}]}, revision)
+    assert store.get("p")["assignments"] == [{"id": "generated"}]
+    assert store.snapshot("missing") is None
+    assert store.delete("p") and not store.put_if_unchanged(plan, revision + 1)
+
+
+def test_plan_store_backends_must_implement_the_interface():
+    class Partial(PlanStore):
+        def get(self, plan_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_memory_plan_store_locks_each_plan_separately():
+    store = MemoryPlanStore()
+    store.put_many([{"plan_id": "a"}, {"plan_id": "b"}])
+    done = threading.Event()
+
+    def edit_b() -> None:
+        with store.editing("b") as plan:
+            plan["title"] = "B"
+        done.set()
+
+    with store.editing("a"):
+        threading.Thread(target=edit_b).start()
+        assert done.wait(5)
+    assert store.get("b")["title"] == "B"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_generation_never_overwrites_concurrent_edits(client, tmp_path, monkeypatch, backend):
+    if backend == "sqlite":
+        client.application.config["PLAN_STORE"] = SQLitePlanStore(tmp_path / "plans.sqlite3")
+    store = client.application.config["PLAN_STORE"]
+    r = client.post("/plan", json={
+        "title": "Plan",
+        "start_date": "2025-02-24",
+        "assignments": [{"id": "a1", "unit": "CITS3200", "title": "Essay", "type": "essay", "due_date": "2025-03-20"}],
+    })
+    pid = r.get_json()["plan_id"]
+
+    def rename(title: str) -> None:  # an edit from another worker
+        with store.editing(pid) as plan:
+            plan["assignments"][0]["title"] = title
+
+    real_batch = plan_routes.generate_milestones_for_plans
+    monkeypatch.setattr(plan_routes, "generate_milestones_for_plans", lambda plans: rename("Renamed") or real_batch(plans))
+    body = client.post("/plan/generate-batch", json={"plan_ids": [pid]}).get_json()
+    assert body["generated"] == 0
+    assert body["errors"] == [{"plan_id": pid, "message": plan_routes._CHANGED_WHILE_GENERATING}]
+    assert store.get(pid)["assignments"][0]["title"] == "Renamed"
+    assert "milestones" not in store.get(pid)["assignments"][0]
+
+    # A single /generate starts over on the edited plan and keeps the edit.
+    edits = iter(["Again", "And again"])
+    real_one = plan_routes.regenerate_milestones_for_plan
+
+    def generate_with_edit(plan):
+        title = next(edits, None)
+        if title:
+            rename(title)
+        return real_one(plan)
+
+    monkeypatch.setattr(plan_routes, "regenerate_milestones_for_plan", generate_with_edit)
+    r = client.post(f"/plan/{pid}/generate")
+    assert r.status_code == 200
+    assert r.get_json()["assignments"][0]["title"] == "And again"
+    assert store.get(pid)["assignments"][0]["milestones"]
+
+    edits = iter(["1", "2", "3"])
+    assert client.post(f"/plan/{pid}/generate").status_code == 409
+    assert store.get(pid)["assignments"][0]["title"] == "3"
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services import semester_store
+from app.services.dates import parse_day
+
+
+@pytest.fixture()
+def semesters_dir(tmp_path, monkeypatch):
+    """An empty semesters directory behind a cold semester cache."""
+    dest = tmp_path / "semesters"
+    dest.mkdir()
+    monkeypatch.setattr(semester_store, "SEMESTERS_DIR", dest)
+    monkeypatch.setattr(semester_store, "_store", semester_store._make_store(dest))
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    monkeypatch.setenv("SEMESTERS_WATCH", "0")
+    return dest
+
+
+def _save(sid: str, start: str, end: str) -> None:
+    semester_store.save_semester({"id": sid, "name": sid.title(), "start_date": start, "end_date": end})
+
+
+def test_semester_at_uses_the_interval_index(semesters_dir):
+    _save("s1", "2025-02-24", "2025-05-23")
+    _save("summer", "2025-01-06", "2025-12-19")
+    _save("s2", "2025-07-21", "2025-10-17")
+
+    def at(day: str):
+        found = semester_store.semester_at(parse_day(day))
+        return found and found["id"]
+
+    assert at("2025-02-24") == "s1"
+    assert at("2025-05-23") == "s1"
+    assert at("2025-06-01") == "summer"  # only the long, earlier-starting span covers it
+    assert at("2025-08-01") == "s2"
+    assert at("2025-12-19") == "summer"
+    assert at("2024-12-31") is None
+    assert at("2026-01-01") is None
+
+    assert semester_store.delete_semester("s2")
+    assert at("2025-08-01") == "summer"
+    assert semester_store.get_semester("s1")["end_date"] == "2025-05-23"
+
+
+def test_semesters_at_route(client, semesters_dir):
+    _save("s1", "2025-02-24", "2025-05-23")
+
+    resp = client.get("/semesters/at?date=2025-03-01")
+    assert resp.status_code == 200
+    assert resp.get_json()["id"] == "s1"
+    assert client.get("/semesters/at?date=2025-03-01", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+    assert client.get("/semesters/at?date=2025-06-01").status_code == 404
+    assert client.get("/semesters/at?date=soon").status_code == 400
+    assert client.get("/semesters/at").status_code == 400
+
+
+def test_semester_breaks_are_validated_and_block_days(client, semesters_dir):
+    bad = client.post("/semesters", json={
+        "name": "S1", "start_date": "2025-02-24", "end_date": "2025-05-23",
+        "breaks": [{"start_date": "2025-04-20", "end_date": "2025-04-14"}],
+    })
+    assert bad.status_code == 400
+    assert "breaks[0]" in bad.get_json()["message"]
+
+    resp = client.post("/semesters", json={
+        "name": "S1", "start_date": "2025-02-24", "end_date": "2025-05-23",
+        "breaks": [{"name": "Study break", "start_date": "2025-04-14", "end_date": "2025-04-20"}],
+    })
+    assert resp.status_code == 201
+    assert resp.get_json()["breaks"] == [{"name": "Study break", "start_date": "2025-04-14", "end_date": "2025-04-20"}]
+
+    blocked = semester_store.blocked_days()
+    assert blocked.is_blocked(parse_day("2025-04-14")) and blocked.is_blocked(parse_day("2025-04-20"))
+    assert not blocked.is_blocked(parse_day("2025-04-21"))
+
+
+def test_bulk_import_reports_every_bad_row_and_writes_nothing(client, semesters_dir):
+    rows = [
+        {"id": "2025-s1", "name": "S1 2025", "start_date": "2025-02-24", "end_date": "2025-05-23"},
+        {"name": "Broken", "start_date": "2025-07-21"},
+        {"id": "2025-s1", "name": "Again", "start_date": "2025-07-21", "end_date": "2025-10-17"},
+        {"name": "Backwards", "start_date": "2025-10-17", "end_date": "2025-07-21"},
+    ]
+    resp = client.post("/semesters/bulk", json=rows)
+    assert resp.status_code == 400
+    assert [e["row"] for e in resp.get_json()["errors"]] == [2, 3, 4]
+    assert list(semesters_dir.iterdir()) == []
+
+    resp = client.post("/semesters/bulk", json={"semesters": [rows[0], {**rows[2], "id": "2025-s2"}]})
+    assert resp.status_code == 201
+    assert resp.get_json()["imported"] == 2
+    assert [s["id"] for s in client.get("/semesters").get_json()] == ["2025-s1", "2025-s2"]
+    assert semester_store._store._catalog.version == 1
+
+
+def test_bulk_import_accepts_csv(client, semesters_dir):
+    table = (
+        "id,name,start_date,end_date,breaks\n"
+        "2026-s1,Semester 1 2026,2026-02-23,2026-05-29,Study break:2026-04-06..2026-04-12\n"
+        "2026-s2,Semester 2 2026,2026-07-20,2026-11-06,2026-09-28..2026-10-04; 2026-10-26..2026-11-06\n"
+    )
+    resp = client.post("/semesters/bulk", data=table, content_type="text/csv")
+    assert resp.status_code == 201
+    s1, s2 = resp.get_json()["semesters"]
+    assert s1["breaks"] == [{"name": "Study break", "start_date": "2026-04-06", "end_date": "2026-04-12"}]
+    assert len(s2["breaks"]) == 2
+    assert semester_store.blocked_days().is_blocked(parse_day("2026-10-01"))
+
+    bad = client.post("/semesters/bulk", data=table.replace("2026-04-12", "2026-04-01"), content_type="text/csv")
+    assert bad.status_code == 400
+    assert bad.get_json()["errors"][0]["row"] == 1
+
+
+def test_broken_semester_file_is_skipped(semesters_dir):
+    _save("s1", "2025-02-24", "2025-05-23")
+    (semesters_dir / "broken.yaml").write_text("name: [unterminated\n", encoding="utf-8")
+    semester_store._store.invalidate("broken.yaml")
+    assert [s["id"] for s in semester_store.list_semesters()] == ["s1"]
+
+
+def test_bulk_import_rejects_ids_that_are_not_file_names(client, semesters_dir, tmp_path):
+    row = {"name": "Evil", "start_date": "2025-02-24", "end_date": "2025-05-23"}
+    for sid in ("../types/evil", "a/b"):
+        resp = client.post("/semesters/bulk", json=[{**row, "id": sid}])
+        assert resp.status_code == 400
+        assert resp.get_json()["errors"][0]["row"] == 1
+    assert list(semesters_dir.iterdir()) == []
+    assert not (tmp_path / "types" / "evil.yaml").exists()
+
+    with pytest.raises(ValueError):
+        semester_store._store.save([{**row, "id": "../evil"}])
+    assert not (tmp_path / "evil.yaml").exists()
+
+
+def test_ids_with_underscores_round_trip(client, semesters_dir):
+    row = {"id": "sem_1_2026", "name": "Semester 1", "start_date": "2026-02-23", "end_date": "2026-05-29"}
+    assert client.post("/semesters/bulk", json=[row]).status_code == 201
+    assert client.get("/semesters/sem_1_2026").status_code == 200
+    assert client.delete("/semesters/sem_1_2026").status_code == 204
+    assert client.get("/semesters/sem_1_2026").status_code == 404
+    assert client.delete("/semesters/sem_1_2026").status_code == 404
+    assert list(semesters_dir.iterdir()) == []
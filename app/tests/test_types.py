@@ -91,3 +91,416 @@ def test_create_update_delete_flow(client):
 
     missing = client.get(f"/types/{tid}")
     assert missing.status_code == 404
+
+
+def _cold_type_cache(monkeypatch, types_dir):
+    """Point type_store at `types_dir` with an empty, polling-only cache."""
+    from app.services import type_store
+
+    monkeypatch.setattr(type_store, "TYPES_DIR", types_dir)
+    monkeypatch.setattr(type_store, "_store", type_store._make_store(types_dir))
+    monkeypatch.setenv("TYPES_WATCH", "0")
+
+
+def test_type_cache_reparses_only_changed_files(assignment_types_dir, monkeypatch):
+    import json
+    import os
+
+    from app.services import document_store, type_store
+
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    loaded: list[str] = []
+    real_load = document_store.load_document
+    monkeypatch.setattr(document_store, "load_document", lambda p: loaded.append(p.name) or real_load(p))
+
+    assert type_store.get_type("essay")
+    assert "essay.json" in loaded
+    version = type_store.cache_version()
+
+    # Within the poll interval lookups never touch the disk.
+    path = assignment_types_dir / "essay.json"
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    doc["title"] = "Edited essay"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    loaded.clear()
+    type_store.get_type("essay")
+    assert loaded == []
+
+    type_store._store._state["next_poll"] = 0.0
+    assert type_store.get_type("essay")["title"] == "Edited essay"
+    assert loaded == ["essay.json"]
+    assert type_store.cache_version() == version + 1
+
+
+def test_cold_start_loads_types_from_snapshot(assignment_types_dir, monkeypatch):
+    from app.services import document_store, snapshot, type_store
+
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    expected = dict(type_store.list_types())
+    assert snapshot.snapshot_path(assignment_types_dir).exists()
+
+    loaded: list[str] = []
+    real_load = document_store.load_document
+    monkeypatch.setattr(document_store, "load_document", lambda p: loaded.append(p.name) or real_load(p))
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    assert type_store.list_types() == expected
+    assert loaded == []
+
+    # A file that changed since the snapshot was written is parsed again.
+    path = assignment_types_dir / "essay.json"
+    path.write_text(path.read_text(encoding="utf-8").replace('"Essay"', '"Long essay"', 1), encoding="utf-8")
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    assert type_store.get_type("essay")["title"] == "Long essay"
+    assert loaded == ["essay.json"]
+
+
+def test_conditional_get_returns_304_until_types_change(client):
+    first = client.get("/types")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert first.headers.get("Last-Modified")
+
+    again = client.get("/types", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    one = client.get("/types/essay")
+    assert client.get("/types/essay", headers={"If-None-Match": one.headers["ETag"]}).status_code == 304
+    meta = client.get("/types/metadata")
+    assert client.get("/types/metadata", headers={"If-None-Match": meta.headers["ETag"]}).status_code == 304
+
+    created = client.post("/types", json=_sample_payload("Etag Probe"))
+    assert created.status_code == 201
+    assert created.headers["Cache-Control"] == "no-store"
+    try:
+        changed = client.get("/types", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+    finally:
+        client.delete(f"/types/{created.get_json()['id']}")
+
+
+def test_bulk_import_is_all_or_nothing(client):
+    bad = client.post("/types/bulk", json=[_sample_payload("Bulk One"), {"title": "Broken"}])
+    assert bad.status_code == 400
+    assert "types[1]" in bad.get_json()["message"]
+    assert client.get("/types/bulk-one").status_code == 404
+
+    resp = client.post("/types/bulk", json={"types": [_sample_payload("Bulk One"), _sample_payload("Bulk Two")]})
+    assert resp.status_code == 201
+    payload = resp.get_json()
+    try:
+        assert payload["imported"] == 2
+        assert [t["id"] for t in payload["types"]] == ["bulk-one", "bulk-two"]
+        assert client.get("/types/bulk-two").get_json()["title"] == "Bulk Two"
+    finally:
+        for t in payload["types"]:
+            client.delete(f"/types/{t['id']}")
+
+
+def test_save_types_restores_files_when_a_rename_fails(assignment_types_dir, monkeypatch):
+    import pytest
+
+    from app.services import type_store
+
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    before = (assignment_types_dir / "essay.json").read_bytes()
+    real_replace = type_store.os.replace
+    calls = []
+
+    def flaky_replace(src, dst):
+        calls.append(dst)
+        if str(dst).endswith("new-type.json"):  # the second rename of the batch
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(type_store.os, "replace", flaky_replace)
+    with pytest.raises(OSError):
+        type_store.save_types([{**_sample_payload("Essay"), "id": "essay"}, _sample_payload("New Type")])
+    monkeypatch.setattr(type_store.os, "replace", real_replace)
+
+    assert (assignment_types_dir / "essay.json").read_bytes() == before
+    assert not (assignment_types_dir / "new-type.json").exists()
+    assert not [p for p in assignment_types_dir.iterdir() if p.suffix == ".tmp"]
+
+
+def test_reload_is_single_flight_and_readers_keep_old_catalog(assignment_types_dir, monkeypatch):
+    import threading
+
+    from app.services import type_store
+
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    old = type_store.list_types()
+    assert old
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    real_refresh = type_store._store._refresh
+
+    def slow_refresh(*args, **kwargs):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        real_refresh(*args, **kwargs)
+
+    monkeypatch.setattr(type_store._store, "_refresh", slow_refresh)
+    type_store._store._state["stale"] = True
+    rebuilder = threading.Thread(target=type_store.list_types)
+    rebuilder.start()
+    assert started.wait(5)
+
+    # While one thread rebuilds, everyone else is served the previous catalogue at once.
+    seen = []
+    readers = [threading.Thread(target=lambda: seen.append(type_store.list_types())) for _ in range(8)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join(5)
+    assert len(seen) == 8 and all(s is old for s in seen)
+
+    release.set()
+    rebuilder.join(5)
+    assert calls == [1]
+
+
+def test_shared_catalog_is_rebuilt_once_and_adopted_by_other_workers(assignment_types_dir, monkeypatch):
+    from app.services import document_store, type_store
+
+    monkeypatch.setenv("SHARED_CATALOG", "1")
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    assert type_store.get_type("essay")
+    first_worker = type_store._store
+    assert first_worker._catalog.generation == 1
+
+    # A second worker starts cold and adopts the published catalogue without parsing.
+    loaded: list[str] = []
+    real_load = document_store.load_document
+    monkeypatch.setattr(document_store, "load_document", lambda p: loaded.append(p.name) or real_load(p))
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    assert type_store.get_type("essay")["title"] == "Essay"
+    assert loaded == []
+
+    saved = type_store.save_type({**type_store.get_type("essay"), "title": "Shared essay"})
+    assert saved["title"] == "Shared essay"
+    assert loaded == ["essay.json"]
+
+    # Back in the first worker, the new generation is picked up from the shared file.
+    monkeypatch.setattr(type_store, "_store", first_worker)
+    assert type_store.get_type("essay")["title"] == "Shared essay"
+    assert loaded == ["essay.json"]
+    assert first_worker._catalog.generation == 2
+
+
+def test_cold_worker_waits_for_the_rescan_it_lost_the_lock_to(assignment_types_dir, monkeypatch):
+    import threading
+
+    from app.services import shared_catalog, type_store
+
+    monkeypatch.setenv("SHARED_CATALOG", "1")
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    first_worker = type_store._store
+
+    # The first worker holds the rebuild lock while a second one starts cold.
+    lock = shared_catalog.SharedCatalog(assignment_types_dir).rebuild_lock()
+    assert lock.__enter__()
+    results = []
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    second = threading.Thread(target=lambda: results.append(type_store.get_type("essay")))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive() and not results
+
+    with first_worker._lock:
+        first_worker._refresh()
+    lock.__exit__(None, None, None)
+    second.join(5)
+    assert results and results[0]["title"] == "Essay"
+    assert type_store._store._catalog.by_id.keys() == first_worker._catalog.by_id.keys()
+
+
+def test_search_and_paginate_types(client):
+    resp = client.get("/types?q=ess&limit=10")
+    assert resp.status_code == 200
+    payload = resp.get_json()
+    assert [t["id"] for t in payload["items"]] == ["essay"]
+    assert payload["next_cursor"] is None and payload["total"] == 1
+
+    everything = client.get("/types").get_json()
+    ids = sorted(t["id"] for t in everything)
+    page = client.get("/types?limit=2").get_json()
+    seen = [t["id"] for t in page["items"]]
+    while page["next_cursor"]:
+        page = client.get(f"/types?limit=2&cursor={page['next_cursor']}").get_json()
+        seen += [t["id"] for t in page["items"]]
+    assert seen == ids
+
+    assert client.get("/types?limit=0").status_code == 400
+
+
+def test_type_index_matches_every_word_as_a_prefix():
+    from app.services.type_index import TypeIndex
+
+    index = TypeIndex({
+        "essay": {"id": "essay", "title": "Essay", "milestones": [{"name": "Draft outline"}]},
+        "lab-report": {"id": "lab-report", "title": "Lab Report", "milestones": [{"name": "Run experiment"}]},
+        "report": {"id": "report", "title": "Report", "milestones": [{"name": "Draft"}]},
+    })
+    assert [r["id"] for r in index.search("rep")[0]] == ["lab-report", "report"]
+    assert [r["id"] for r in index.search("draft")[0]] == ["essay", "report"]
+    assert [r["id"] for r in index.search("lab exp")[0]] == ["lab-report"]
+    assert index.search("nothing")[0] == []
+    rows, cursor, total = index.search("", limit=1, after="essay")
+    assert [r["id"] for r in rows] == ["lab-report"] and cursor == "lab-report" and total == 3
+
+
+def test_expand_full_and_delta_fetch(client):
+    full = client.get("/types?expand=full").get_json()
+    assert full and all("milestones" in t for t in full)
+    assert [t["id"] for t in full] == sorted(t["id"] for t in client.get("/types").get_json())
+
+    first = client.get("/types?since=1970-01-01T00:00:00Z").get_json()
+    assert first["full"] is True
+    assert len(first["types"]) == len(full) and first["deleted"] == []
+
+    created = client.post("/types", json=_sample_payload("Delta Probe")).get_json()
+    try:
+        delta = client.get(f"/types?since={first['generated_at']}").get_json()
+        assert delta["full"] is False
+        assert [t["id"] for t in delta["types"]] == [created["id"]]
+        assert delta["types"][0]["milestones"]
+    finally:
+        client.delete(f"/types/{created['id']}")
+
+    gone = client.get(f"/types?since={delta['generated_at']}").get_json()
+    assert gone["types"] == [] and gone["deleted"] == [created["id"]]
+    assert client.get("/types?since=yesterday").status_code == 400
+
+
+def test_delta_reports_edits_that_keep_the_old_mtime(client, assignment_types_dir):
+    import json
+    import os
+
+    from app.services import type_store
+
+    cursor = client.get("/types?since=1970-01-01T00:00:00Z").get_json()["generated_at"]
+    path = assignment_types_dir / "essay.json"
+    st = path.stat()
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    path.write_text(json.dumps({**doc, "title": "Copied essay"}), encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))  # as `cp -p` or `rsync -t` would
+    type_store._store.invalidate(path.name)
+
+    delta = client.get(f"/types?since={cursor}").get_json()
+    assert delta["full"] is False
+    assert [(t["id"], t["title"]) for t in delta["types"]] == [("essay", "Copied essay")]
+    assert client.get(f"/types?since={delta['generated_at']}").get_json()["types"] == []
+
+
+def test_yaml_loader_cache_round_trips_dates(tmp_path, monkeypatch):
+    from datetime import date
+
+    import yaml
+
+    from app.services import yaml_loader
+
+    monkeypatch.setattr(yaml_loader, "CACHE_DIR", tmp_path / "yaml-cache")
+    text = "id: s1\nstart_date: 2025-02-24\nweeks: [1, 2]\nnested: {when: 2025-03-01}\n"
+    first = yaml_loader.load_yaml(text)
+    parsed = yaml_loader.stats()["parsed"]
+    second = yaml_loader.load_yaml(text)
+    assert yaml_loader.stats()["parsed"] == parsed
+    assert first == second == yaml.safe_load(text)
+    assert second["start_date"] == date(2025, 2, 24)
+    assert second is not first
+
+
+def test_yaml_loader_cache_skips_non_string_keys_and_stays_bounded(tmp_path, monkeypatch):
+    import yaml
+
+    from app.services import yaml_loader
+
+    cache = tmp_path / "yaml-cache"
+    monkeypatch.setattr(yaml_loader, "CACHE_DIR", cache)
+    monkeypatch.setattr(yaml_loader, "CACHE_MAX_ENTRIES", 3)
+    text = "weeks: {1: intro, 2: review}\n"
+    assert yaml_loader.load_yaml(text) == yaml_loader.load_yaml(text) == yaml.safe_load(text)
+    assert not cache.exists() or list(cache.iterdir()) == []
+
+    for i in range(5):
+        yaml_loader.load_yaml(f"id: s{i}\n")
+    assert yaml_loader.prune() == 2
+    assert len(list(cache.glob("*.json"))) == 3
+
+
+def test_yaml_cache_keeps_a_catalogue_larger_than_its_bound(tmp_path, monkeypatch):
+    from app.services import yaml_loader
+    from app.services.document_store import DocumentStore
+
+    cache = tmp_path / "yaml-cache"
+    monkeypatch.setattr(yaml_loader, "CACHE_DIR", cache)
+    monkeypatch.setattr(yaml_loader, "CACHE_MAX_ENTRIES", 3)
+    monkeypatch.setenv("STORE_SNAPSHOTS", "0")
+    monkeypatch.setenv("DOCS_WATCH", "0")
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(6):
+        (docs / f"d{i}.yaml").write_text(f"id: d{i}\nweek: {i}\n", encoding="utf-8")
+    yaml_loader.load_yaml("id: unrelated\n")  # least recently used: evicted first
+
+    assert len(DocumentStore(docs, name="docs").catalog().by_id) == 6
+    assert len(list(cache.glob("*.json"))) == 6
+
+    # A second cold reload is served from the cache entirely.
+    hits = yaml_loader.stats()["cache_hits"]
+    assert len(DocumentStore(docs, name="docs").catalog().by_id) == 6
+    assert yaml_loader.stats()["cache_hits"] == hits + 6
+
+    # Editing a file leaves its previous entry unused, and the next reload drops it.
+    (docs / "d0.yaml").write_text("id: d0\nweek: 10\n", encoding="utf-8")
+    store = DocumentStore(docs, name="docs")
+    assert store.catalog().by_id["d0"]["week"] == 10
+    assert len(list(cache.glob("*.json"))) == 6
+
+
+def test_healthz_reports_yaml_loader(client):
+    payload = client.get("/healthz").get_json()
+    assert payload["yaml_loader"] in {"libyaml", "pure-python", "unavailable"}
+
+
+def test_type_versions_are_archived_and_immutable(client, assignment_types_dir, monkeypatch):
+    import os
+
+    from app.services import type_store
+
+    _cold_type_cache(monkeypatch, assignment_types_dir)
+    # Loading the catalogue is a read: nothing is archived until a type is written.
+    assert type_store.get_type("essay")
+    assert not (assignment_types_dir / "_versions").exists()
+
+    created = client.post("/types", json=_sample_payload("Versioned")).get_json()
+    old = type_store.version_hash(created)
+    updated = client.put("/types/versioned", json={**_sample_payload("Versioned"), "description": "v2"}).get_json()
+    new = type_store.version_hash(updated)
+    assert old != new
+
+    resp = client.get(f"/types/versioned/versions/{old}")
+    assert resp.status_code == 200
+    assert resp.get_json() == created
+    assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert resp.headers["ETag"] == f'"{old}"'
+    assert client.get(f"/types/versioned/versions/{old}", headers={"If-None-Match": f'"{old}"'}).status_code == 304
+    assert client.get(f"/types/essay/versions/{old}").status_code == 404
+    assert client.get("/types/versioned/versions/not-a-hash").status_code == 404
+
+    # Current versions and versions still referenced by plans survive compaction.
+    assert type_store.compact_versions(keep={old}) == []
+    stale = assignment_types_dir / "_versions" / f"{old}.json"
+    os.utime(stale, (0, 0))
+    assert type_store.compact_versions(min_age=60) == [old]
+    assert not stale.exists()
+    assert client.get(f"/types/versioned/versions/{new}").status_code == 200
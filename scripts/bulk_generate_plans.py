@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Generate milestones for many plans offline, fanned out across processes.
+
+Reads one plan per line (JSON Lines) and writes the generated plans back as
+JSON Lines in the same order. Plans that fail are written as
+``{"plan_id": ..., "error": ...}``. Throughput is reported on stderr.
+
+    python3 scripts/bulk_generate_plans.py roster.jsonl -o plans.jsonl --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Deque, Iterator, List
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_generate = None
+
+
+def _init_worker() -> None:
+    """Import the generator and warm the type cache once per worker process."""
+    global _generate
+    from app.services import type_store
+    from app.services.generator import generate_milestones_for_plan
+    from app.services.templates import get_template
+
+    for tid in type_store.list_types():
+        get_template(tid)
+    _generate = generate_milestones_for_plan
+
+
+def _generate_chunk(lines: List[str]) -> List[str]:
+    out = []
+    for line in lines:
+        plan = None
+        try:
+            plan = json.loads(line)
+            _generate(plan)
+            out.append(json.dumps(plan, ensure_ascii=False))
+        except Exception as exc:  # one bad plan must not sink the whole chunk
+            plan_id = plan.get("plan_id") if isinstance(plan, dict) else None
+            out.append(json.dumps({"plan_id": plan_id, "error": str(exc)}, ensure_ascii=False))
+    return out
+
+
+def _chunks(src: IO[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for line in src:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(src: IO[str], dst: IO[str], workers: int, chunk_size: int) -> int:
+    """Stream plans from `src` to `dst`; returns the number of plans written."""
+    written = 0
+    # Bound the number of chunks in flight so memory stays flat for any input size.
+    in_flight: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for chunk in _chunks(src, chunk_size):
+            in_flight.append(pool.submit(_generate_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                for line in in_flight.popleft().result():
+                    dst.write(line + "\n")
+                    written += 1
+        while in_flight:
+            for line in in_flight.popleft().result():
+                dst.write(line + "\n")
+                written += 1
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSON Lines file of plans, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSON Lines file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=200, help="plans per worker task")
+    args = parser.parse_args()
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        count = run(src, dst, max(1, args.workers), max(1, args.chunk_size))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0.0
+    print(f"Generated {count} plans in {elapsed:.2f}s ({rate:.0f} plans/s, {args.workers} workers).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Delete archived assignment type versions that nothing references any more.
+
+Every saved type is archived under ``data/types/_versions/<sha1>.json`` and
+generated assignments record that hash as ``type_version``. This removes
+archived versions that are not the current version of any type, are not
+referenced by any plan, and are older than ``--min-age-days``.
+
+Plans are read from the ``--plans`` files and, when ``PLAN_DB`` is set, from
+the shared plan database as well. Without either, the script refuses to run:
+it cannot tell which versions plans still reference.
+
+    PLAN_DB=data/plans.sqlite3 python3 scripts/compact_type_versions.py --min-age-days 30
+    python3 scripts/compact_type_versions.py --plans plans.jsonl --min-age-days 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+# Plans fetched from the plan store per round trip.
+_BATCH_SIZE = 500
+
+
+def _versions_of(plans: Iterable[dict], keep: Set[str]) -> None:
+    """Add the `type_version` of every assignment in `plans` to `keep`."""
+    for plan in plans:
+        for a in plan.get("assignments") or []:
+            if isinstance(a, dict) and a.get("type_version"):
+                keep.add(str(a["type_version"]))
+
+
+def _referenced_versions(paths: List[str]) -> Set[str]:
+    """`type_version` of every assignment in the given JSON Lines plan files."""
+    keep: Set[str] = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            _versions_of(_iter_plans(fh), keep)
+    return keep
+
+
+def _stored_versions() -> Set[str]:
+    """`type_version` of every assignment in the plan store named by ``PLAN_DB``."""
+    from app.services import plan_store
+
+    store = plan_store.from_config({})
+    ids = store.ids()
+    keep: Set[str] = set()
+    for i in range(0, len(ids), _BATCH_SIZE):
+        _versions_of(store.get_many(ids[i:i + _BATCH_SIZE]).values(), keep)
+    return keep
+
+
+def _iter_plans(lines) -> Iterator[dict]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            plan = json.loads(line)
+            if isinstance(plan, dict):
+                yield plan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--plans", action="append", default=[], help="JSON Lines file of plans whose versions are kept (repeatable)"
+    )
+    parser.add_argument("--min-age-days", type=float, default=30.0, help="only delete versions older than this")
+    args = parser.parse_args()
+    if not args.plans and not os.environ.get("PLAN_DB"):
+        parser.error("no plans to check: pass --plans or set PLAN_DB")
+
+    from app.services import type_store
+
+    keep = _referenced_versions(args.plans)
+    if os.environ.get("PLAN_DB"):
+        keep |= _stored_versions()
+    removed = type_store.compact_versions(keep=keep, min_age=max(0.0, args.min_age_days) * 86400)
+    for version in removed:
+        print(version)
+    print(f"Removed {len(removed)} archived type versions.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()